@@ -0,0 +1,180 @@
+"""
+Benchmark do pipeline BCB/SGS (offline)
+=======================================
+Gera payloads sintéticos no formato do SGS (dd/mm/yyyy, valor como string
+com vírgula decimal) e mede, para cada tamanho, cada etapa do pipeline:
+- processar_serie (referência) e processar_serie_rapido (parse em lote)
+- calcular_kpis
+- calcular_series_derivadas (motor python e, se houver numpy, motor numpy)
+- escrita dos JSON como em main() (EscritorArtefatos; a passada de memória
+  encontra os arquivos inalterados e mede só a serialização + comparação)
+
+Para cada etapa registra tempo de parede e pico de memória (tracemalloc, numa
+segunda passada para não distorcer o tempo). O resultado vai para um JSON
+que permite comparar execuções e motores.
+
+Uso:
+    python benchmark_pipeline.py --pontos 1000 100000 1000000 --series 3
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+from fetch_bcb_data import (
+    EscritorArtefatos,
+    calcular_kpis,
+    calcular_series_derivadas,
+    np,
+    processar_serie,
+    processar_serie_rapido,
+)
+
+SAIDA_PADRAO = os.path.join(os.path.dirname(__file__), "benchmark_resultados.json")
+DATA_INICIAL = date(1900, 1, 1)
+DIAS_DISPONIVEIS = (date(9999, 12, 31) - DATA_INICIAL).days
+
+
+def gerar_payload(n_pontos: int, semente: int = 0) -> list[dict]:
+    """
+    Payload diário sintético. Acima de ~2.9M pontos não há dias suficientes no
+    calendário, então datas passam a se repetir (sempre em ordem crescente).
+    """
+    aleatorio = random.Random(semente)
+    dias = min(n_pontos, DIAS_DISPONIVEIS)
+    datas = {}
+    payload = []
+    valor = 5.0
+    for i in range(n_pontos):
+        deslocamento = i * dias // n_pontos
+        if deslocamento not in datas:
+            datas[deslocamento] = (DATA_INICIAL + timedelta(days=deslocamento)).strftime("%d/%m/%Y")
+        valor *= 1 + aleatorio.gauss(0, 0.01)
+        payload.append({"data": datas[deslocamento], "valor": f"{valor:.4f}".replace(".", ",")})
+    return payload
+
+
+def gerar_payload_mensal(n_pontos: int, semente: int = 0) -> list[dict]:
+    """Série mensal tipo IPCA com ~1 ponto a cada 21 pontos diários."""
+    aleatorio = random.Random(semente)
+    meses = max(12, n_pontos // 21)
+    return [
+        {
+            "data": f"01/{m % 12 + 1:02d}/{1900 + min(m // 12, 8099):04d}",
+            "valor": f"{aleatorio.uniform(-0.3, 1.2):.2f}",
+        }
+        for m in range(meses)
+    ]
+
+
+def medir(funcao: Callable, memoria: bool) -> tuple[float, int, object]:
+    """Executa a função e devolve (segundos, pico de memória em bytes, retorno)."""
+    if not memoria:
+        inicio = time.perf_counter()
+        retorno = funcao()
+        return time.perf_counter() - inicio, 0, retorno
+    tracemalloc.start()
+    try:
+        retorno = funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return 0.0, pico, retorno
+
+
+def etapas_para(payloads: dict, diretorio: str) -> list[tuple[str, Callable, Callable]]:
+    """
+    Lista (nome, preparo, etapa). O preparo roda fora da medição e devolve os
+    argumentos da etapa; assim cada etapa é medida isoladamente.
+    """
+    def processados():
+        return {nome: processar_serie_rapido(raw, verbose=False) for nome, raw in payloads.items()}
+
+    def trios(series):
+        diarias = [nome for nome in series if not nome.startswith("mensal")]
+        return [
+            (series[nome], series[nome], series[f"mensal_{nome}"]) for nome in diarias
+        ]
+
+    def como_series(selic, usd, ipca):
+        return {"selic": selic, "usd_brl": usd, "ipca": ipca}
+
+    def escrever(series):
+        escritor = EscritorArtefatos()
+        for nome, dados in series.items():
+            escritor.adicionar_json(os.path.join(diretorio, f"{nome}.json"), dados)
+        escritor.gravar()
+
+    etapas = [
+        ("processar_serie", lambda: payloads,
+         lambda p: {nome: processar_serie(raw) for nome, raw in p.items()}),
+        ("processar_serie_rapido", lambda: payloads,
+         lambda p: {nome: processar_serie_rapido(raw, verbose=False) for nome, raw in p.items()}),
+        ("calcular_kpis", lambda: trios(processados()),
+         lambda t: [calcular_kpis(*trio) for trio in t]),
+        ("derivadas_python", lambda: trios(processados()),
+         lambda t: [calcular_series_derivadas(como_series(*trio)) for trio in t]),
+    ]
+    if np is not None:
+        etapas.append(("derivadas_numpy", lambda: trios(processados()),
+                       lambda t: [calcular_series_derivadas(como_series(*trio), motor="numpy") for trio in t]))
+    etapas.append(("escrita_json", processados, escrever))
+    return etapas
+
+
+def executar(lista_pontos: list[int], n_series: int, memoria: bool = True) -> dict:
+    resultados = []
+    for n_pontos in lista_pontos:
+        payloads = {}
+        for i in range(n_series):
+            payloads[f"serie_{i}"] = gerar_payload(n_pontos, semente=i)
+            payloads[f"mensal_serie_{i}"] = gerar_payload_mensal(n_pontos, semente=i)
+        total = sum(len(p) for p in payloads.values())
+        print(f"[BENCH] {n_pontos} pontos x {n_series} séries ({total} registros)")
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            for nome, preparo, etapa in etapas_para(payloads, diretorio):
+                argumentos = preparo()
+                segundos, _, _ = medir(lambda: etapa(argumentos), memoria=False)
+                pico = medir(lambda: etapa(argumentos), memoria=True)[1] if memoria else None
+                resultados.append({
+                    "etapa": nome,
+                    "pontos": n_pontos,
+                    "series": n_series,
+                    "registros": total,
+                    "segundos": round(segundos, 6),
+                    "registros_por_s": round(total / segundos) if segundos else None,
+                    "pico_memoria_bytes": pico,
+                })
+                memoria_txt = f", pico {pico / 2**20:.1f} MiB" if pico is not None else ""
+                print(f"  {nome:<22} {segundos:10.4f}s{memoria_txt}")
+
+    return {
+        "executado_em": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__ if np is not None else None,
+        "resultados": resultados,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline BCB/SGS")
+    parser.add_argument("--pontos", type=int, nargs="+", default=[1_000, 10_000, 100_000],
+                        help="tamanhos de série a medir (ex.: 1000 1000000 10000000)")
+    parser.add_argument("--series", type=int, default=3, help="número de séries por tamanho")
+    parser.add_argument("--sem-memoria", action="store_true",
+                        help="pula a passada com tracemalloc (pico de memória)")
+    parser.add_argument("--saida", default=SAIDA_PADRAO, help="arquivo JSON de resultados")
+    args = parser.parse_args()
+
+    relatorio = executar(args.pontos, args.series, memoria=not args.sem_memoria)
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"[SAVE] {args.saida}")
@@ -8,23 +8,177 @@ Consome séries temporais via API pública do BCB/SGS:
 
 Janela: 36 meses de histórico (mínimo exigido: 24)
 Output: arquivos JSON prontos para consumo no dashboard
+
+Modo incremental (--incremental): guarda a última data ingerida de cada
+série em raw/_watermarks.json e busca apenas os pontos posteriores a ela.
+As derivadas salvas também são reaproveitadas: raw/_estado_derivadas.json
+registra o trecho de cada série que elas cobrem, e só os pontos afetados
+pelos dados novos (e pelo corte do início da janela) são recalculados.
+
+As séries são buscadas em paralelo (--concorrencia N) por um pool de threads
+que compartilha uma única requests.Session (conexões keep-alive reaproveitadas).
+Janelas longas são quebradas em blocos de até DIAS_POR_BLOCO dias, buscados em
+paralelo e remontados em ordem (o SGS limita o tamanho de cada resposta).
+
+Séries derivadas: declaradas em SERIES[nome]["derivadas"] (chave de saída ->
+cálculo registrado em CALCULOS_DERIVADOS) e calculadas sob demanda por
+CalculadoraDerivadas, que memoiza cada (série, cálculo). Nova série ou nova
+métrica = nova entrada nos registros, sem mexer no pipeline.
+--motor numpy usa somas acumuladas (O(n)) em vez de
+recalcular cada janela móvel; o motor python continua sendo a referência.
+No modo incremental, retornos, volatilidade e média móvel do USD/BRL são
+atualizados ponto a ponto (O(1)) por EstadoUsdStreaming, persistido em
+raw/_estado_streaming.json entre execuções.
+
+Falhas do SGS: erros de conexão, timeouts e HTTP 429/5xx são repetidos até
+MAX_TENTATIVAS vezes com backoff exponencial com jitter, dentro de um prazo
+por série (--prazo). Falhas seguidas abrem o circuito da série (DisjuntorSgs)
+e as demais requisições dela falham na hora. Sem resposta, vale a do cache
+HTTP, mesmo expirada, ou a última série salva em raw/.
+
+Cache HTTP: respostas do SGS ficam em raw/_cache_http, chaveadas por
+(codigo, dataInicial, dataFinal), com TTL por série (ttl_cache em SERIES),
+revalidação por ETag/Last-Modified e descarte LRU acima de CACHE_HTTP_MAX_BYTES.
+Desative com --sem-cache.
+
+O parse dos payloads usa processar_serie_rapido: datas dd/mm/yyyy viram ISO
+por fatiamento fixo e os valores são convertidos em lote; linhas fora do
+padrão caem no processar_serie original (mesmo aviso, mesmo descarte).
+
+Streaming (--stream): a resposta do SGS é lida em pedaços e o array JSON é
+decodificado incrementalmente (iterar_array_json), alimentando o parser em
+lotes; o payload bruto nunca é materializado inteiro em memória. Combinado
+com --incremental, só os pontos depois do watermark vêm em streaming.
+
+Com --processos N, parse e derivadas de cada série rodam num
+ProcessPoolExecutor; os KPIs, que cruzam séries, vêm depois. A saída é
+idêntica à do caminho sequencial.
+
+Resoluções: raw/resolucoes/ recebe a pirâmide que o dashboard pode carregar
+conforme o zoom: semanal.json, mensal.json e trimestral.json (OHLC + média
+por período) e lttb_<PONTOS_LTTB>.json (séries e derivadas reduzidas por
+Largest-Triangle-Three-Buckets).
+
+Publicação (--publicar): raw/publicado/ recebe cada JSON do dashboard
+minificado, com o hash do conteúdo no nome, mais as variantes .gz e .br
+(brotli é opcional) e um manifest.json; artefatos inalterados não são
+regravados, então podem ser servidos com cache longo.
+
+Gravação: os artefatos de uma execução são gravados juntos no fim por
+EscritorArtefatos (serialização em paralelo, temporário + fsync +
+os.replace), pulando os que não mudaram; o dashboard nunca lê um JSON
+pela metade.
+
+Modo residente (--daemon): ServicoAtualizacao mantém Session, cache,
+séries e derivadas em memória e executar_daemon atualiza cada série só
+quando a agenda dela vence (SERIES[nome]["agenda"]: SELIC e câmbio em dias
+úteis, IPCA mensal), com retentativas se o ponto novo atrasar.
+SIGTERM/Ctrl-C encerram ao fim da atualização em curso.
+
+Métricas: cada etapa (fetch, processar, salvar, kpis, derivadas, resolucoes)
+registra por série tempo de parede, registros, bytes recebidos, requisições e
+retentativas em raw/metricas.json; --prometheus ARQ grava o mesmo no formato
+texto do Prometheus (textfile collector do node exporter).
 """
 
+import argparse
+import calendar
+import codecs
+import gzip
+import hashlib
 import requests
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Optional
+import random
+import re
+import signal
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from bisect import bisect_left, bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, Optional
+
+from requests.adapters import HTTPAdapter
+
+try:
+    import numpy as np
+except ImportError:  # numpy é opcional, só o motor vetorizado depende dele
+    np = None
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional, sem ele a publicação gera só .gz
+    brotli = None
 
 # Configurações
 BCB_SGS_URL = "https://api.bcb.gov.br/dados/serie/bcdata.sgs.{}/dados"
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "raw")
+WATERMARK_PATH = os.path.join(OUTPUT_DIR, "_watermarks.json")
+ESTADO_STREAMING_PATH = os.path.join(OUTPUT_DIR, "_estado_streaming.json")
+ESTADO_DERIVADAS_PATH = os.path.join(OUTPUT_DIR, "_estado_derivadas.json")
+CACHE_HTTP_DIR = os.path.join(OUTPUT_DIR, "_cache_http")
+CACHE_HTTP_MAX_BYTES = 64 * 1024 * 1024
+METRICAS_PATH = os.path.join(OUTPUT_DIR, "metricas.json")
+RESOLUCOES_DIR = os.path.join(OUTPUT_DIR, "resolucoes")
+PONTOS_LTTB = 500  # pontos por série na versão reduzida para gráficos
+PUBLICACAO_DIR = os.path.join(OUTPUT_DIR, "publicado")
 MESES_HISTORICO = 36
+MAX_CONCORRENCIA = 4  # requisições simultâneas ao SGS
+TAMANHO_PEDACO_STREAM = 64 * 1024  # bytes lidos por vez da resposta
+LOTE_PARSE = 10_000  # registros por lote no parse em streaming
+DIAS_POR_BLOCO = 5 * 365  # SGS recusa consultas de séries diárias acima de 10 anos
+TIMEOUT_REQUISICAO = 30  # segundos por tentativa (limitado pelo prazo da série)
+MAX_TENTATIVAS = 4
+BACKOFF_BASE_S = 0.5  # espera máxima antes da 2ª tentativa; dobra a cada falha
+BACKOFF_MAX_S = 8.0
+PRAZO_SERIE_S = 120.0  # orçamento de tempo de cada série, somando blocos e tentativas
+CIRCUITO_LIMITE_FALHAS = 5  # falhas seguidas de uma série até abrir o circuito
+CIRCUITO_PAUSA_S = 60.0  # tempo com o circuito aberto antes de tentar de novo
+STATUS_RETENTAVEIS = {429, 500, 502, 503, 504}
 
+# Registro de séries:
+# - codigo/descricao: série no SGS
+# - frequencia: "diaria" ou "mensal"
+# - agenda: quando o SGS publica pontos novos (regra em AGENDAS, modo --daemon)
+# - ttl_cache: segundos em que uma resposta cacheada é servida sem ir ao SGS
+# - derivadas: chave em series_derivadas.json -> cálculo em CALCULOS_DERIVADOS
+#   (calculados sob demanda por CalculadoraDerivadas)
 SERIES = {
-    "selic": {"codigo": 11, "descricao": "Taxa SELIC (% a.a.)"},
-    "usd_brl": {"codigo": 1, "descricao": "USD/BRL - Câmbio Venda"},
-    "ipca": {"codigo": 433, "descricao": "IPCA - Variação % Mensal"},
+    "selic": {
+        "codigo": 11,
+        "descricao": "Taxa SELIC (% a.a.)",
+        "frequencia": "diaria",
+        "agenda": "diaria",
+        "ttl_cache": 12 * 3600,
+        "derivadas": {"selic_mensal": "ultimo_mensal"},
+    },
+    "usd_brl": {
+        "codigo": 1,
+        "descricao": "USD/BRL - Câmbio Venda",
+        "frequencia": "diaria",
+        "agenda": "diaria",
+        "ttl_cache": 3600,
+        "derivadas": {
+            "retornos_diarios_usd": "retornos",
+            "volatilidade_movel_30d": "volatilidade_movel_30d",
+            "media_movel_30d_usd": "media_movel_30d",
+            "usd_mensal_avg": "media_mensal",
+        },
+    },
+    "ipca": {
+        "codigo": 433,
+        "descricao": "IPCA - Variação % Mensal",
+        "frequencia": "mensal",
+        "agenda": "mensal",
+        "ttl_cache": 24 * 3600,
+        "derivadas": {"ipca_acumulado_12m_rolling": "acumulado_12m"},
+    },
 }
 
 
@@ -35,25 +189,567 @@ def calcular_janela(meses: int = MESES_HISTORICO) -> tuple[str, str]:
     return inicio.strftime("%d/%m/%Y"), fim.strftime("%d/%m/%Y")
 
 
-def fetch_serie(codigo: int, data_inicio: str, data_fim: str) -> list[dict]:
-    """Busca série temporal do BCB/SGS via API REST."""
-    url = BCB_SGS_URL.format(codigo)
+class MetricasPipeline:
+    """
+    Acumula métricas por (série, etapa): segundos, registros, bytes_recebidos,
+    requisicoes, cache_hits e retentativas (requisições repetidas após uma falha
+    transitória). Thread-safe, pois o fetch roda em pool.
+    """
+
+    CAMPOS = ("segundos", "registros", "bytes_recebidos", "requisicoes", "cache_hits", "retentativas")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self.inicio = datetime.now()
+            self.etapas = {}  # (serie, etapa) -> {campo: valor}
+
+    def somar(self, serie: str, etapa: str, **valores) -> None:
+        with self._lock:
+            atual = self.etapas.setdefault((serie, etapa), dict.fromkeys(self.CAMPOS, 0))
+            for campo, valor in valores.items():
+                atual[campo] += valor
+
+    @contextmanager
+    def etapa(self, etapa: str, serie: str = "_pipeline"):
+        """Mede o tempo de parede do bloco e o soma à etapa da série."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.somar(serie, etapa, segundos=time.perf_counter() - inicio)
+
+    def para_dict(self) -> dict:
+        with self._lock:
+            etapas = [
+                {"serie": serie, "etapa": etapa, **{k: round(v, 6) if k == "segundos" else v
+                                                     for k, v in valores.items()}}
+                for (serie, etapa), valores in self.etapas.items()
+            ]
+        return {"inicio": self.inicio.strftime("%Y-%m-%d %H:%M:%S"), "etapas": etapas}
+
+    def salvar_json(self, path: str = METRICAS_PATH) -> None:
+        _gravar_json(path, self.para_dict())
+
+    def salvar_prometheus(self, path: str) -> None:
+        """Formato texto do Prometheus; grava em .tmp e renomeia (o collector lê a qualquer momento)."""
+        linhas = []
+        etapas = self.para_dict()["etapas"]
+        for campo in self.CAMPOS:
+            metrica = f"bcb_pipeline_{campo}"
+            linhas.append(f"# HELP {metrica} {campo} por série e etapa na última execução")
+            linhas.append(f"# TYPE {metrica} gauge")
+            for item in etapas:
+                linhas.append(f'{metrica}{{serie="{item["serie"]}",etapa="{item["etapa"]}"}} {item[campo]}')
+        linhas.append("# HELP bcb_pipeline_ultima_execucao_timestamp fim da última execução (epoch)")
+        linhas.append("# TYPE bcb_pipeline_ultima_execucao_timestamp gauge")
+        linhas.append(f"bcb_pipeline_ultima_execucao_timestamp {time.time():.0f}")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("\n".join(linhas) + "\n")
+        os.replace(path + ".tmp", path)
+
+
+# Registro global, no estilo dos clientes Prometheus: fetch_serie e main() reportam aqui
+METRICAS = MetricasPipeline()
+
+
+def nome_da_serie(codigo: int) -> str:
+    """Nome da série em SERIES para o código SGS (ou "sgs_<codigo>")."""
+    for nome, config in SERIES.items():
+        if config["codigo"] == codigo:
+            return nome
+    return f"sgs_{codigo}"
+
+
+def criar_sessao(max_conexoes: int = MAX_CONCORRENCIA) -> requests.Session:
+    """
+    Cria uma Session com pool keep-alive de `max_conexoes` conexões. O pool
+    bloqueia quando todas estão em uso, então o limite vale para a execução
+    inteira: séries e blocos em paralelo (pools de threads aninhados) esperam
+    uma conexão livre em vez de abrir conexões extras.
+    """
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max_conexoes, pool_block=True)
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+
+class CacheHttp:
+    """
+    Cache em disco das respostas do SGS. Cada entrada guarda o corpo JSON,
+    o instante em que foi validada e os cabeçalhos ETag/Last-Modified; um
+    índice (_indice.json) registra tamanho e último acesso para o descarte LRU.
+    Entradas e índice são gravados de forma atômica (EscritorArtefatos); um
+    arquivo ilegível vale como ausente. Os acessos por leitura só vão para o
+    disco na próxima gravação.
+    """
+
+    CAMPOS_ENTRADA = ("salvo_em", "etag", "last_modified", "corpo")
+
+    def __init__(self, diretorio: str = CACHE_HTTP_DIR, max_bytes: int = CACHE_HTTP_MAX_BYTES):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(diretorio, exist_ok=True)
+        self._indice_path = os.path.join(diretorio, "_indice.json")
+        self._indice = self._carregar_indice()
+
+    def _carregar_indice(self) -> dict:
+        if not os.path.exists(self._indice_path):
+            return {}
+        try:
+            with open(self._indice_path, encoding="utf-8") as f:
+                indice = json.load(f)
+            if all({"bytes", "acesso"} <= item.keys() for item in indice.values()):
+                return indice
+        except (OSError, ValueError, AttributeError):
+            pass
+        # índice corrompido: refeito a partir das entradas presentes no diretório
+        print(f"  [CACHE] Índice {self._indice_path} ilegível, reconstruindo")
+        indice = {}
+        for arquivo in os.listdir(self.diretorio):
+            chave, extensao = os.path.splitext(arquivo)
+            if extensao == ".json" and arquivo != "_indice.json":
+                info = os.stat(os.path.join(self.diretorio, arquivo))
+                indice[chave] = {"bytes": info.st_size, "acesso": info.st_mtime}
+        self._gravar_arquivo(self._indice_path, json.dumps(indice).encode("utf-8"))
+        return indice
+
+    @staticmethod
+    def chave(codigo: int, data_inicio: str, data_fim: str) -> str:
+        return hashlib.sha1(f"{codigo}|{data_inicio}|{data_fim}".encode()).hexdigest()
+
+    def _path(self, chave: str) -> str:
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    @staticmethod
+    def _gravar_arquivo(path: str, conteudo: bytes) -> None:
+        escritor = EscritorArtefatos(max_threads=1)
+        escritor.adicionar(path, lambda: conteudo)
+        escritor.gravar()
+
+    def _salvar_indice(self) -> None:
+        self._gravar_arquivo(self._indice_path, json.dumps(self._indice).encode("utf-8"))
+
+    def _descartar(self, chave: str) -> None:
+        self._indice.pop(chave, None)
+        if os.path.exists(self._path(chave)):
+            os.remove(self._path(chave))
+
+    def obter(self, chave: str) -> Optional[dict]:
+        with self._lock:
+            if chave not in self._indice or not os.path.exists(self._path(chave)):
+                self._indice.pop(chave, None)
+                return None
+            try:
+                with open(self._path(chave), encoding="utf-8") as f:
+                    entrada = json.load(f)
+                if not all(campo in entrada for campo in self.CAMPOS_ENTRADA):
+                    raise ValueError("campos ausentes")
+            except (OSError, ValueError, TypeError) as erro:
+                print(f"  [CACHE] Entrada {chave} ilegível ({type(erro).__name__}), descartada")
+                self._descartar(chave)
+                return None
+            self._indice[chave]["acesso"] = time.time()
+            return entrada
+
+    def gravar(self, chave: str, corpo: list, etag: Optional[str] = None,
+               last_modified: Optional[str] = None) -> None:
+        entrada = {"salvo_em": time.time(), "etag": etag, "last_modified": last_modified, "corpo": corpo}
+        conteudo = json.dumps(entrada, ensure_ascii=False).encode("utf-8")
+        with self._lock:
+            self._gravar_arquivo(self._path(chave), conteudo)
+            self._indice[chave] = {"bytes": len(conteudo), "acesso": time.time()}
+            self._descartar_lru()
+            self._salvar_indice()
+
+    def _descartar_lru(self) -> None:
+        total = sum(item["bytes"] for item in self._indice.values())
+        for chave in sorted(self._indice, key=lambda c: self._indice[c]["acesso"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._indice[chave]["bytes"]
+            self._descartar(chave)
+
+
+def ttl_cache(codigo: int) -> float:
+    """TTL configurado em SERIES para o código (0 = sempre revalidar)."""
+    return SERIES.get(nome_da_serie(codigo), {}).get("ttl_cache", 0)
+
+
+class SgsIndisponivel(RuntimeError):
+    """SGS não respondeu dentro das tentativas/prazo, ou o circuito da série está aberto."""
+
+
+class DisjuntorSgs:
+    """
+    Circuit breaker por código de série: após CIRCUITO_LIMITE_FALHAS falhas
+    seguidas o circuito abre e as requisições falham na hora, sem esperar
+    timeouts, até passar a pausa. Depois dela uma nova tentativa é liberada:
+    sucesso fecha o circuito, falha o reabre. Thread-safe (blocos em paralelo).
+    """
+
+    def __init__(self, limite_falhas: int = CIRCUITO_LIMITE_FALHAS, pausa: float = CIRCUITO_PAUSA_S):
+        self.limite_falhas = limite_falhas
+        self.pausa = pausa
+        self._falhas = {}
+        self._aberto_ate = {}
+        self._lock = threading.Lock()
+
+    def permitir(self, codigo: int) -> bool:
+        with self._lock:
+            return time.monotonic() >= self._aberto_ate.get(codigo, 0.0)
+
+    def registrar_sucesso(self, codigo: int) -> None:
+        with self._lock:
+            self._falhas[codigo] = 0
+            self._aberto_ate.pop(codigo, None)
+
+    def registrar_falha(self, codigo: int) -> None:
+        with self._lock:
+            self._falhas[codigo] = self._falhas.get(codigo, 0) + 1
+            if self._falhas[codigo] >= self.limite_falhas:
+                self._aberto_ate[codigo] = time.monotonic() + self.pausa
+                print(f"  [CIRCUITO] Série {codigo}: {self._falhas[codigo]} falhas seguidas, "
+                      f"aberto por {self.pausa:.0f}s")
+
+
+def requisitar_sgs(codigo: int, enviar: Callable, prazo: Optional[float] = None,
+                   disjuntor: Optional[DisjuntorSgs] = None,
+                   max_tentativas: int = MAX_TENTATIVAS) -> requests.Response:
+    """
+    Chama enviar(timeout) até obter uma resposta que não seja erro transitório
+    (conexão, timeout ou STATUS_RETENTAVEIS), com backoff exponencial com
+    jitter completo entre as tentativas. `prazo` (time.monotonic absoluto)
+    limita o timeout de cada tentativa e as esperas; esgotadas as tentativas
+    ou o prazo, ou com o circuito aberto, levanta SgsIndisponivel.
+    """
+    motivo = "prazo esgotado"
+    for tentativa in range(1, max_tentativas + 1):
+        if disjuntor is not None and not disjuntor.permitir(codigo):
+            raise SgsIndisponivel(f"circuito aberto para a série {codigo}")
+        restante = prazo - time.monotonic() if prazo is not None else TIMEOUT_REQUISICAO
+        if restante <= 0:
+            break
+        METRICAS.somar(nome_da_serie(codigo), "fetch", requisicoes=1, retentativas=int(tentativa > 1))
+        try:
+            response = enviar(min(TIMEOUT_REQUISICAO, restante))
+        except (requests.ConnectionError, requests.Timeout) as erro:
+            motivo = type(erro).__name__
+        else:
+            if response.status_code not in STATUS_RETENTAVEIS:
+                if disjuntor is not None:
+                    disjuntor.registrar_sucesso(codigo)
+                return response
+            motivo = f"HTTP {response.status_code}"
+            response.close()
+
+        if disjuntor is not None:
+            disjuntor.registrar_falha(codigo)
+        if tentativa < max_tentativas:
+            espera = random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (tentativa - 1)))
+            if prazo is not None and time.monotonic() + espera >= prazo:
+                break
+            print(f"  [RETRY] Série {codigo}: {motivo}, nova tentativa em {espera:.1f}s")
+            time.sleep(espera)
+    raise SgsIndisponivel(f"série {codigo} indisponível ({motivo})")
+
+
+def fetch_serie(codigo: int, data_inicio: str, data_fim: str,
+                sessao: Optional[requests.Session] = None,
+                url_base: str = BCB_SGS_URL,
+                cache: Optional[CacheHttp] = None,
+                prazo: Optional[float] = None,
+                disjuntor: Optional[DisjuntorSgs] = None) -> list[dict]:
+    """
+    Busca série temporal do BCB/SGS via API REST. Se o SGS estiver
+    indisponível e houver resposta no cache, mesmo expirada, ela é usada.
+    """
+    url = url_base.format(codigo)
     params = {
         "formato": "json",
         "dataInicial": data_inicio,
         "dataFinal": data_fim,
     }
-    print(f"  GET {url}")
-    print(f"  Params: {params}")
+    headers = {}
+    chave = CacheHttp.chave(codigo, data_inicio, data_fim) if cache else None
+    entrada = cache.obter(chave) if cache else None
+    if entrada is not None:
+        if time.time() - entrada["salvo_em"] < ttl_cache(codigo):
+            METRICAS.somar(nome_da_serie(codigo), "fetch", cache_hits=1)
+            print(f"  [CACHE] Série {codigo} {data_inicio}-{data_fim}: {len(entrada['corpo'])} registros (TTL)")
+            return entrada["corpo"]
+        if entrada["etag"]:
+            headers["If-None-Match"] = entrada["etag"]
+        if entrada["last_modified"]:
+            headers["If-Modified-Since"] = entrada["last_modified"]
 
-    response = requests.get(url, params=params, timeout=30)
-    response.raise_for_status()
+    # um único print por evento para não embaralhar a saída entre threads
+    print(f"  GET {url}\n  Params: {params}")
 
-    dados = response.json()
-    print(f"  -> {len(dados)} registros recebidos")
+    try:
+        response = requisitar_sgs(
+            codigo,
+            lambda timeout: (sessao or requests).get(url, params=params, headers=headers, timeout=timeout),
+            prazo, disjuntor,
+        )
+    except SgsIndisponivel as erro:
+        if entrada is None:
+            raise
+        METRICAS.somar(nome_da_serie(codigo), "fetch", cache_hits=1)
+        print(f"  [CACHE] {erro}; usando resposta expirada do cache ({len(entrada['corpo'])} registros)")
+        return entrada["corpo"]
+    METRICAS.somar(nome_da_serie(codigo), "fetch", bytes_recebidos=len(response.content))
+    if response.status_code == 304 and entrada is not None:
+        METRICAS.somar(nome_da_serie(codigo), "fetch", cache_hits=1)
+        print(f"  [CACHE] Série {codigo}: 304 Not Modified, reaproveitando resposta")
+        cache.gravar(chave, entrada["corpo"], entrada["etag"], entrada["last_modified"])
+        return entrada["corpo"]
+    if response.status_code == 404:
+        # SGS responde 404 quando não há valores no intervalo pedido
+        print("  -> 0 registros recebidos (sem dados no intervalo)")
+        dados = []
+    else:
+        response.raise_for_status()
+        dados = response.json()
+        print(f"  -> {len(dados)} registros recebidos (série {codigo})")
+
+    # resposta vazia não vai para o cache: é justamente o caso em que o ponto
+    # novo ainda não saiu, e a próxima consulta (retentativa do --daemon,
+    # rodada seguinte) precisa chegar ao SGS em vez de reler o vazio pelo TTL
+    if cache and dados:
+        cache.gravar(chave, dados, response.headers.get("ETag"), response.headers.get("Last-Modified"))
     return dados
 
 
+# resto de número ou literal (true/false/null) que ainda pode continuar no próximo pedaço
+_TOKEN_ABERTO = re.compile(r"[-+.0-9A-Za-z]*\Z")
+_NUMERO_ABERTO = re.compile(r"[-+.0-9eE]*\Z")
+
+
+def _elemento_incompleto(buffer: str, erro: json.JSONDecodeError) -> bool:
+    """
+    O erro de decodificação é só falta de dados (o token que falhou vai até
+    o fim do buffer) ou JSON malformado?
+    """
+    if erro.msg.startswith("Unterminated string"):
+        return True
+    if erro.msg.startswith("Invalid \\uXXXX escape"):
+        return len(buffer) - erro.pos <= 12  # \uXXXX ou par de surrogates cortado
+    return _TOKEN_ABERTO.match(buffer, erro.pos) is not None
+
+
+def iterar_array_json(pedacos: Iterable) -> Iterator:
+    """
+    Decodifica incrementalmente um array JSON de topo ([{...}, {...}])
+    recebido em pedaços (bytes UTF-8 ou str), gerando um elemento por vez.
+    Só o trecho ainda não consumido fica em memória: JSON malformado
+    levanta ValueError assim que aparece, sem esperar o resto da resposta.
+    """
+    decodificador = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos = "", 0
+    estado = "inicio"  # inicio -> elemento <-> separador -> fim
+
+    def pular_espacos(texto, i):
+        while i < len(texto) and texto[i] in " \t\r\n":
+            i += 1
+        return i
+
+    for pedaco in pedacos:
+        buffer = buffer[pos:] + (utf8.decode(pedaco) if isinstance(pedaco, bytes) else pedaco)
+        pos = 0
+        while True:
+            pos = pular_espacos(buffer, pos)
+            if pos >= len(buffer):
+                break
+            if estado == "inicio":
+                if buffer[pos] != "[":
+                    raise ValueError(f"resposta não é um array JSON: {buffer[pos:pos + 20]!r}")
+                pos += 1
+                estado = "primeiro"
+            elif estado in ("primeiro", "elemento"):
+                if estado == "primeiro" and buffer[pos] == "]":
+                    estado = "fim"
+                    pos += 1
+                    continue
+                try:
+                    elemento, fim = decodificador.raw_decode(buffer, pos)
+                except json.JSONDecodeError as erro:
+                    if _elemento_incompleto(buffer, erro):
+                        break  # elemento incompleto: espera o próximo pedaço
+                    raise ValueError(f"JSON inválido na posição {erro.pos}: {erro.msg}") from None
+                proximo = pular_espacos(buffer, fim)
+                if proximo >= len(buffer):
+                    break  # sem delimitador ainda
+                if buffer[proximo] not in ",]":
+                    # um número como "12." pode continuar no próximo pedaço
+                    numero = isinstance(elemento, (int, float)) and not isinstance(elemento, bool)
+                    if numero and proximo == fim and _NUMERO_ABERTO.match(buffer, fim):
+                        break
+                    raise ValueError(f"JSON inválido na posição {proximo}: {buffer[proximo:proximo + 20]!r}")
+                yield elemento
+                pos = fim
+                estado = "separador"
+            elif estado == "separador":
+                if buffer[pos] == ",":
+                    estado = "elemento"
+                elif buffer[pos] == "]":
+                    estado = "fim"
+                else:
+                    raise ValueError(f"JSON inválido na posição {pos}: {buffer[pos:pos + 20]!r}")
+                pos += 1
+            else:
+                raise ValueError("conteúdo após o fim do array JSON")
+
+    if estado != "fim":
+        raise ValueError(f"array JSON inválido ou truncado: {buffer[pos:pos + 40]!r}")
+
+
+def fetch_serie_stream(codigo: int, data_inicio: str, data_fim: str,
+                       sessao: Optional[requests.Session] = None,
+                       url_base: str = BCB_SGS_URL,
+                       prazo: Optional[float] = None,
+                       disjuntor: Optional[DisjuntorSgs] = None) -> Iterator[dict]:
+    """
+    Como fetch_serie, mas gera os registros conforme o corpo chega (sem cache).
+    As retentativas cobrem só o início da resposta, não falhas no meio do corpo.
+    """
+    url = url_base.format(codigo)
+    params = {"formato": "json", "dataInicial": data_inicio, "dataFinal": data_fim}
+    print(f"  GET {url} (stream)\n  Params: {params}")
+
+    response = requisitar_sgs(
+        codigo,
+        lambda timeout: (sessao or requests).get(url, params=params, timeout=timeout, stream=True),
+        prazo, disjuntor,
+    )
+    with response:
+        if response.status_code == 404:
+            print("  -> 0 registros recebidos (sem dados no intervalo)")
+            return
+        response.raise_for_status()
+
+        def pedacos():
+            for pedaco in response.iter_content(chunk_size=TAMANHO_PEDACO_STREAM):
+                METRICAS.somar(nome_da_serie(codigo), "fetch", bytes_recebidos=len(pedaco))
+                yield pedaco
+
+        yield from iterar_array_json(pedacos())
+
+
+def processar_em_lotes(registros: Iterable, tamanho_lote: int = LOTE_PARSE) -> tuple[int, list]:
+    """
+    Consome um iterável de registros brutos em lotes de `tamanho_lote` pelo
+    processar_serie_rapido. Retorna (registros recebidos, série processada).
+    """
+    iterador = iter(registros)
+    recebidos, processados = 0, []
+    while True:
+        lote = list(islice(iterador, tamanho_lote))
+        if not lote:
+            return recebidos, processados
+        recebidos += len(lote)
+        processados.extend(processar_serie_rapido(lote, verbose=False))
+
+
+def buscar_serie_stream(codigo: int, data_inicio: str, data_fim: str,
+                        sessao: Optional[requests.Session] = None,
+                        url_base: str = BCB_SGS_URL,
+                        dias_por_bloco: int = DIAS_POR_BLOCO,
+                        max_concorrencia: int = MAX_CONCORRENCIA,
+                        prazo: Optional[float] = None,
+                        disjuntor: Optional[DisjuntorSgs] = None) -> tuple[int, list]:
+    """
+    Busca e processa a janela em blocos paralelos, cada bloco decodificado em
+    streaming. Retorna (registros recebidos, série processada sem datas repetidas).
+    """
+    blocos = dividir_janela(data_inicio, data_fim, dias_por_bloco)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concorrencia, len(blocos)))) as executor:
+        partes = list(executor.map(
+            lambda bloco: processar_em_lotes(
+                fetch_serie_stream(codigo, bloco[0], bloco[1], sessao, url_base, prazo, disjuntor)
+            ),
+            blocos,
+        ))
+
+    recebidos, processados, vistas = 0, [], set()
+    for n, parte in partes:
+        recebidos += n
+        for item in parte:
+            if item["data"] not in vistas:
+                vistas.add(item["data"])
+                processados.append(item)
+    print(f"  -> {recebidos} registros recebidos em streaming (série {codigo})")
+    return recebidos, processados
+
+
+def dividir_janela(data_inicio: str, data_fim: str,
+                   dias_por_bloco: int = DIAS_POR_BLOCO) -> list[tuple[str, str]]:
+    """Quebra [data_inicio, data_fim] (dd/mm/yyyy) em blocos contíguos sem sobreposição."""
+    inicio = datetime.strptime(data_inicio, "%d/%m/%Y")
+    fim = datetime.strptime(data_fim, "%d/%m/%Y")
+    blocos = []
+    while inicio <= fim:
+        fim_bloco = min(inicio + timedelta(days=dias_por_bloco - 1), fim)
+        blocos.append((inicio.strftime("%d/%m/%Y"), fim_bloco.strftime("%d/%m/%Y")))
+        inicio = fim_bloco + timedelta(days=1)
+    return blocos
+
+
+def fetch_serie_em_blocos(codigo: int, data_inicio: str, data_fim: str,
+                          sessao: Optional[requests.Session] = None,
+                          url_base: str = BCB_SGS_URL,
+                          dias_por_bloco: int = DIAS_POR_BLOCO,
+                          max_concorrencia: int = MAX_CONCORRENCIA,
+                          cache: Optional[CacheHttp] = None,
+                          prazo: Optional[float] = None,
+                          disjuntor: Optional[DisjuntorSgs] = None) -> list[dict]:
+    """
+    Busca a janela em blocos paralelos e remonta em ordem cronológica,
+    descartando datas repetidas nas bordas dos blocos.
+    """
+    blocos = dividir_janela(data_inicio, data_fim, dias_por_bloco)
+    if len(blocos) == 1:
+        return fetch_serie(codigo, data_inicio, data_fim, sessao, url_base, cache, prazo, disjuntor)
+
+    print(f"  [BLOCOS] Série {codigo}: {len(blocos)} blocos de até {dias_por_bloco} dias")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concorrencia, len(blocos)))) as executor:
+        partes = list(executor.map(
+            lambda bloco: fetch_serie(
+                codigo, bloco[0], bloco[1], sessao, url_base, cache, prazo, disjuntor
+            ),
+            blocos,
+        ))
+
+    dados, vistas = [], set()
+    for parte in partes:
+        for item in parte:
+            if item.get("data") in vistas:
+                continue
+            vistas.add(item.get("data"))
+            dados.append(item)
+    return dados
+
+
+def executar_por_serie(tarefa: Callable, nomes: list,
+                       max_concorrencia: int = MAX_CONCORRENCIA) -> dict:
+    """
+    Executa tarefa(nome) para cada série num pool de threads limitado a
+    max_concorrencia. O dict de retorno segue a ordem de `nomes`; a primeira
+    exceção levantada é propagada.
+    """
+    if max_concorrencia <= 1:
+        return {nome: tarefa(nome) for nome in nomes}
+    with ThreadPoolExecutor(max_workers=max_concorrencia) as executor:
+        futuros = {nome: executor.submit(tarefa, nome) for nome in nomes}
+        return {nome: futuro.result() for nome, futuro in futuros.items()}
+
+
 def processar_serie(dados_raw: list[dict]) -> list[dict]:
     """Padroniza formato: converte data e valor."""
     processados = []
@@ -68,21 +764,311 @@ def processar_serie(dados_raw: list[dict]) -> list[dict]:
     return processados
 
 
+def _dias_no_mes(mes_ano: str) -> int:
+    """Último dia válido para "mm/yyyy" (0 se o texto não for mês/ano válido)."""
+    mes, ano = mes_ano[:2], mes_ano[3:]
+    if mes_ano[2] != "/" or not (mes + ano).isdecimal() or not (mes + ano).isascii():
+        return 0
+    if not 1 <= int(mes) <= 12 or int(ano) < 1:
+        return 0
+    return calendar.monthrange(int(ano), int(mes))[1]
+
+
+def processar_serie_rapido(dados_raw: list[dict], verbose: bool = True) -> list[dict]:
+    """
+    Mesmo resultado de processar_serie em uma passada: datas dd/mm/yyyy são
+    fatiadas direto para ISO (validação de dia por mês/ano em cache) e os
+    valores são convertidos em lote. Registros que não seguem o formato fixo
+    vão para processar_serie, que mantém o aviso e o descarte.
+    """
+    inicio = time.perf_counter()
+    dias_no_mes = {}
+    saida = [None] * len(dados_raw)
+    rapidos = []  # (posição, data ISO, valor bruto)
+    lentos = []   # posições tratadas pelo processar_serie
+
+    for pos, item in enumerate(dados_raw):
+        try:
+            data, valor = item["data"], item["valor"]
+        except KeyError:
+            lentos.append(pos)
+            continue
+        if isinstance(data, str) and len(data) == 10 and data[2] == data[5] == "/":
+            mes_ano = data[3:]
+            if mes_ano not in dias_no_mes:
+                dias_no_mes[mes_ano] = _dias_no_mes(mes_ano)
+            dia = data[:2]
+            if dia.isdecimal() and dia.isascii() and 1 <= int(dia) <= dias_no_mes[mes_ano]:
+                rapidos.append((pos, f"{data[6:]}-{data[3:5]}-{dia}", valor))
+                continue
+        lentos.append(pos)
+
+    # conversão em lote: junta os textos, troca vírgula decimal uma vez e usa map(float)
+    textos = [valor for _, _, valor in rapidos]
+    valores = None
+    if all(isinstance(t, str) for t in textos):
+        partes = "\x1f".join(textos).replace(",", ".").split("\x1f")
+        if len(partes) == len(textos):
+            try:
+                valores = list(map(float, partes))
+            except ValueError:
+                valores = None  # algum valor inválido: converte um a um abaixo
+
+    for indice, (pos, data, valor) in enumerate(rapidos):
+        if valores is not None:
+            saida[pos] = {"data": data, "valor": valores[indice]}
+            continue
+        try:
+            saida[pos] = {
+                "data": data,
+                "valor": float(valor.replace(",", ".")) if isinstance(valor, str) else float(valor),
+            }
+        except (ValueError, TypeError):
+            lentos.append(pos)
+
+    for pos in lentos:
+        processado = processar_serie([dados_raw[pos]])
+        saida[pos] = processado[0] if processado else None
+
+    processados = [item for item in saida if item is not None]
+    segundos = time.perf_counter() - inicio
+    if verbose and dados_raw:
+        taxa = len(dados_raw) / segundos if segundos else float("inf")
+        print(f"  [PARSE] {len(dados_raw)} registros em {segundos:.4f}s ({taxa:,.0f} registros/s)")
+    return processados
+
+
+# os.umask só lê trocando o valor; feito uma vez, na importação, e não a cada escritor
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class EscritorArtefatos:
+    """
+    Grava um lote de artefatos de forma atômica. gravar() serializa e compara
+    cada artefato num pool de threads (um arquivo avulso é gravado direto na
+    thread chamadora): se o sha256 do conteúdo bate com o do arquivo atual,
+    ele não é regravado; senão vai para um temporário no mesmo diretório,
+    com fsync. Só com todos os temporários prontos eles são
+    renomeados (os.replace), na ordem em que foram adicionados, e cada
+    diretório recebe um único fsync. Um leitor vê o arquivo antigo ou o novo,
+    nunca um truncado; se algo falhar antes das renomeações, nada muda.
+    """
+
+    def __init__(self, max_threads: int = MAX_CONCORRENCIA):
+        self.max_threads = max_threads
+        self._pendentes = []  # (path, função que devolve os bytes)
+        self._modo = 0o666 & ~_UMASK  # mkstemp cria com 0600
+
+    def adicionar(self, path: str, gerar: Callable[[], bytes]) -> None:
+        self._pendentes.append((path, gerar))
+
+    def adicionar_json(self, path: str, objeto, **opcoes) -> None:
+        opcoes = {"ensure_ascii": False, "indent": 2, **opcoes}
+        self.adicionar(path, lambda: json.dumps(objeto, **opcoes).encode("utf-8"))
+
+    @staticmethod
+    def _sha256_arquivo(path: str) -> str:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for pedaco in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(pedaco)
+        return sha.hexdigest()
+
+    def _preparar(self, path: str, gerar: Callable[[], bytes]) -> Optional[str]:
+        """Devolve o temporário com o conteúdo novo, ou None se o arquivo não mudou."""
+        conteudo = gerar()
+        if (os.path.exists(path) and os.path.getsize(path) == len(conteudo)
+                and self._sha256_arquivo(path) == hashlib.sha256(conteudo).hexdigest()):
+            return None
+        diretorio = os.path.dirname(path) or "."
+        os.makedirs(diretorio, exist_ok=True)
+        fd, temporario = tempfile.mkstemp(dir=diretorio, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(conteudo)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(temporario, self._modo)
+        except BaseException:
+            os.remove(temporario)
+            raise
+        return temporario
+
+    def gravar(self) -> dict:
+        """Grava o lote pendente. Devolve path -> True (gravado) ou False (inalterado)."""
+        pendentes, self._pendentes = self._pendentes, []
+        if not pendentes:
+            return {}
+        threads = max(1, min(self.max_threads, len(pendentes)))
+        temporarios, erro = [], None
+        if threads == 1:
+            # arquivo avulso (cache HTTP, _gravar_json sem escritor): sem pool de threads
+            for path, gerar in pendentes:
+                try:
+                    temporarios.append(self._preparar(path, gerar))
+                except BaseException as e:
+                    erro = e
+                    break
+        else:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                futuros = [executor.submit(self._preparar, path, gerar) for path, gerar in pendentes]
+            for futuro in futuros:
+                try:
+                    temporarios.append(futuro.result())
+                except BaseException as e:
+                    temporarios.append(None)
+                    erro = erro or e
+        if erro is not None:
+            for temporario in temporarios:
+                if temporario is not None:
+                    os.remove(temporario)
+            raise erro
+
+        diretorios = set()
+        for (path, _), temporario in zip(pendentes, temporarios):
+            if temporario is not None:
+                os.replace(temporario, path)
+                diretorios.add(os.path.dirname(path) or ".")
+        if os.name == "posix":  # fsync do diretório torna a renomeação durável
+            for diretorio in diretorios:
+                fd = os.open(diretorio, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        return {path: temporario is not None for (path, _), temporario in zip(pendentes, temporarios)}
+
+
+def _gravar_json(path: str, objeto, escritor: Optional[EscritorArtefatos] = None, **opcoes) -> None:
+    """Enfileira no `escritor` ou, sem ele, grava na hora (também de forma atômica)."""
+    destino = escritor if escritor is not None else EscritorArtefatos(max_threads=1)
+    destino.adicionar_json(path, objeto, **opcoes)
+    if escritor is None:
+        destino.gravar()
+
+
+def carregar_watermarks(path: str = WATERMARK_PATH) -> dict:
+    """Lê o mapa série -> última data ingerida (ISO)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar_watermarks(watermarks: dict, path: str = WATERMARK_PATH,
+                      escritor: Optional[EscritorArtefatos] = None) -> None:
+    """Persiste o mapa de watermarks ao lado dos raw/*.json."""
+    _gravar_json(path, dict(watermarks), escritor, sort_keys=True)
+
+
+def carregar_serie_salva(nome: str) -> Optional[list]:
+    """Carrega a série processada gravada na última execução, se existir."""
+    path = os.path.join(OUTPUT_DIR, f"{nome}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def mesclar_series(antiga: list, nova: list, data_minima: Optional[str] = None) -> list:
+    """Une duas séries processadas por data (a nova prevalece) e corta a janela."""
+    por_data = {item["data"]: item for item in antiga}
+    for item in nova:
+        por_data[item["data"]] = item
+    return [
+        por_data[data] for data in sorted(por_data)
+        if data_minima is None or data >= data_minima
+    ]
+
+
+def buscar_incremental(nome: str, codigo: int, data_inicio: str, data_fim: str,
+                       watermarks: dict,
+                       sessao: Optional[requests.Session] = None,
+                       cache: Optional[CacheHttp] = None,
+                       prazo: Optional[float] = None,
+                       disjuntor: Optional[DisjuntorSgs] = None,
+                       salva: Optional[list] = None,
+                       stream: bool = False,
+                       max_concorrencia: int = MAX_CONCORRENCIA,
+                       url_base: str = BCB_SGS_URL) -> tuple[int, list]:
+    """
+    Busca só os pontos posteriores ao watermark da série e mescla com o salvo
+    (`salva`, se já estiver em memória, ou o gravado em raw/).
+    Retorna (registros recebidos, série processada completa). Sem watermark ou
+    sem série salva, cai na busca completa da janela. Com `stream`, os pontos
+    novos vêm pelo buscar_serie_stream (sem passar pelo cache HTTP).
+    """
+    def buscar_pontos(inicio: str, fim: str) -> tuple[int, list]:
+        if stream:
+            return buscar_serie_stream(
+                codigo, inicio, fim, sessao, url_base,
+                max_concorrencia=max_concorrencia, prazo=prazo, disjuntor=disjuntor,
+            )
+        raw = fetch_serie_em_blocos(
+            codigo, inicio, fim, sessao, url_base, max_concorrencia=max_concorrencia,
+            cache=cache, prazo=prazo, disjuntor=disjuntor,
+        )
+        return len(raw), processar_serie_rapido(raw)
+
+    data_minima = datetime.strptime(data_inicio, "%d/%m/%Y").strftime("%Y-%m-%d")
+    if salva is None:
+        salva = carregar_serie_salva(nome)
+    watermark = watermarks.get(nome)
+
+    if not salva or not watermark:
+        print("  [INCR] Sem watermark, buscando janela completa")
+        recebidos, novos = buscar_pontos(data_inicio, data_fim)
+        return recebidos, mesclar_series([], novos, data_minima)
+
+    proximo_dia = datetime.strptime(watermark, "%Y-%m-%d") + timedelta(days=1)
+    if proximo_dia > datetime.strptime(data_fim, "%d/%m/%Y"):
+        print(f"  [INCR] Watermark {watermark} já cobre a janela, nada a buscar")
+        return 0, mesclar_series(salva, [], data_minima)
+
+    print(f"  [INCR] Watermark {watermark}, buscando apenas pontos novos")
+    recebidos, novos = buscar_pontos(proximo_dia.strftime("%d/%m/%Y"), data_fim)
+    return recebidos, mesclar_series(salva, novos, data_minima)
+
+
+class IndiceSerie:
+    """
+    Índice de uma série processada (ordenada por data): dias ordinais para
+    busca binária por data e valores ordenados para percentis. Construído
+    uma vez por série e compartilhado por todos os KPIs; cada consulta é O(log n).
+    """
+
+    def __init__(self, serie: list):
+        self.serie = serie
+        self.ordinais = [date.fromisoformat(item["data"]).toordinal() for item in serie]
+        self.valores_ordenados = sorted(item["valor"] for item in serie)
+
+    def valor_n_dias_atras(self, dias: int) -> Optional[dict]:
+        """Último ponto com data <= (data mais recente - dias); o primeiro se não houver."""
+        if not self.serie:
+            return None
+        posicao = bisect_right(self.ordinais, self.ordinais[-1] - dias) - 1
+        return self.serie[max(posicao, 0)]
+
+    def percentil(self, valor: float) -> float:
+        """Percentual de pontos da série com valor <= `valor`."""
+        posicao = bisect_right(self.valores_ordenados, valor)
+        return round((posicao / len(self.valores_ordenados)) * 100, 1)
+
+
 def calcular_kpis(selic: list, usd: list, ipca: list) -> dict:
-    """Calcula todos os KPIs obrigatórios + extras."""
+    """
+    Calcula todos os KPIs obrigatórios + extras. Os índices (IndiceSerie) das
+    séries consultadas por data ou percentil são montados uma vez por chamada.
+    """
+    indices = {"selic": IndiceSerie(selic), "usd_brl": IndiceSerie(usd)}
 
     # Helpers
     def ultimo(serie):
         return serie[-1] if serie else None
 
-    def valor_n_dias_atras(serie, dias):
-        if not serie:
-            return None
-        data_limite = datetime.strptime(serie[-1]["data"], "%Y-%m-%d") - timedelta(days=dias)
-        for item in reversed(serie):
-            if datetime.strptime(item["data"], "%Y-%m-%d") <= data_limite:
-                return item
-        return serie[0]
+    def valor_n_dias_atras(nome, dias):
+        return indices[nome].valor_n_dias_atras(dias)
 
     def retorno_pct(atual, anterior):
         if anterior and anterior["valor"] != 0:
@@ -115,18 +1101,16 @@ def calcular_kpis(selic: list, usd: list, ipca: list) -> dict:
             acumulado *= (1 + item["valor"] / 100)
         return round((acumulado - 1) * 100, 2)
 
-    def percentil_serie(serie, valor_atual):
+    def percentil_serie(nome, valor_atual):
         """Calcula em qual percentil o valor atual está na série histórica."""
-        valores = sorted([s["valor"] for s in serie])
-        posicao = sum(1 for v in valores if v <= valor_atual)
-        return round((posicao / len(valores)) * 100, 1)
+        return indices[nome].percentil(valor_atual)
 
     # KPIs obrigatórios
     selic_atual = ultimo(selic)
-    selic_30d = valor_n_dias_atras(selic, 30)
+    selic_30d = valor_n_dias_atras("selic", 30)
     usd_atual = ultimo(usd)
-    usd_7d = valor_n_dias_atras(usd, 7)
-    usd_30d = valor_n_dias_atras(usd, 30)
+    usd_7d = valor_n_dias_atras("usd_brl", 7)
+    usd_30d = valor_n_dias_atras("usd_brl", 30)
 
     kpis = {
         "data_atualizacao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -144,7 +1128,7 @@ def calcular_kpis(selic: list, usd: list, ipca: list) -> dict:
             "valor_7d_atras": usd_7d["valor"] if usd_7d else None,
             "valor_30d_atras": usd_30d["valor"] if usd_30d else None,
             "volatilidade_30d": volatilidade_30d(usd),
-            "percentil_historico": percentil_serie(usd, usd_atual["valor"]) if usd_atual else None,
+            "percentil_historico": percentil_serie("usd_brl", usd_atual["valor"]) if usd_atual else None,
         },
         "ipca": {
             "ultimo_mensal": ultimo(ipca)["valor"] if ultimo(ipca) else None,
@@ -172,117 +1156,1149 @@ def calcular_kpis(selic: list, usd: list, ipca: list) -> dict:
     return kpis
 
 
-def calcular_series_derivadas(selic: list, usd: list, ipca: list) -> dict:
-    """Calcula séries derivadas para gráficos do dashboard."""
+# Ordem das chaves em series_derivadas.json (chaves de séries novas vão ao final)
+CHAVES_DERIVADAS = (
+    "retornos_diarios_usd",
+    "volatilidade_movel_30d",
+    "ipca_acumulado_12m_rolling",
+    "media_movel_30d_usd",
+    "usd_mensal_avg",
+    "selic_mensal",
+)
+
+
+def calcular_series_derivadas(series: dict, motor: str = "python") -> dict:
+    """Calcula as séries derivadas (de todas as séries em SERIES) para os gráficos do dashboard."""
+    return CalculadoraDerivadas(series, motor).saida()
+
 
-    # Retornos diários do USD/BRL
-    retornos_usd = []
-    for i in range(1, len(usd)):
-        if usd[i - 1]["valor"] != 0:
-            ret = ((usd[i]["valor"] - usd[i - 1]["valor"]) / usd[i - 1]["valor"]) * 100
-            retornos_usd.append({"data": usd[i]["data"], "valor": round(ret, 4)})
+# Cálculos genéricos (valem para qualquer série). Cada um recebe a série
+# processada ou, se declarar "depende_de", a saída daquele outro cálculo.
 
-    # Volatilidade móvel 30d do USD/BRL
+def _retornos(serie: list) -> list:
+    """Retornos diários em % (pula ponto anterior zero)."""
+    retornos = []
+    for i in range(1, len(serie)):
+        if serie[i - 1]["valor"] != 0:
+            ret = ((serie[i]["valor"] - serie[i - 1]["valor"]) / serie[i - 1]["valor"]) * 100
+            retornos.append({"data": serie[i]["data"], "valor": round(ret, 4)})
+    return retornos
+
+
+def _volatilidade_movel_30d(retornos: list) -> list:
+    """Desvio padrão dos 30 retornos anteriores a cada data."""
     vol_movel = []
-    for i in range(30, len(retornos_usd)):
-        janela = [r["valor"] for r in retornos_usd[i - 30:i]]
+    for i in range(30, len(retornos)):
+        janela = [r["valor"] for r in retornos[i - 30:i]]
         media = sum(janela) / len(janela)
         variancia = sum((r - media) ** 2 for r in janela) / len(janela)
         vol = round((variancia ** 0.5), 4)
-        vol_movel.append({"data": retornos_usd[i]["data"], "valor": vol})
+        vol_movel.append({"data": retornos[i]["data"], "valor": vol})
+    return vol_movel
+
+
+def _media_movel_30d(serie: list) -> list:
+    """Média dos últimos 30 pontos, incluindo o atual."""
+    mm30 = []
+    for i in range(29, len(serie)):
+        janela = [u["valor"] for u in serie[i - 29:i + 1]]
+        mm30.append({"data": serie[i]["data"], "valor": round(sum(janela) / len(janela), 4)})
+    return mm30
+
 
-    # IPCA acumulado 12m rolling
-    ipca_acum_12m = []
-    for i in range(11, len(ipca)):
-        janela = ipca[i - 11:i + 1]
+def _acumulado_12m(serie: list) -> list:
+    """Acumulado geométrico de 12 períodos: ∏(1 + taxa/100) - 1."""
+    acum_12m = []
+    for i in range(11, len(serie)):
+        janela = serie[i - 11:i + 1]
         acum = 1.0
         for item in janela:
             acum *= (1 + item["valor"] / 100)
-        ipca_acum_12m.append({"data": ipca[i]["data"], "valor": round((acum - 1) * 100, 2)})
+        acum_12m.append({"data": serie[i]["data"], "valor": round((acum - 1) * 100, 2)})
+    return acum_12m
 
-    # Média móvel 30d do USD/BRL
-    mm30_usd = []
-    for i in range(29, len(usd)):
-        janela = [u["valor"] for u in usd[i - 29:i + 1]]
-        mm30_usd.append({"data": usd[i]["data"], "valor": round(sum(janela) / len(janela), 4)})
 
-    # Correlação móvel SELIC vs USD (por mês)
-    # Agrupa USD por mês (média) e cruza com SELIC
-    usd_mensal = {}
-    for item in usd:
+def _media_mensal(serie: list) -> list:
+    """Média de cada mês (yyyy-mm)."""
+    por_mes = {}
+    for item in serie:
         mes = item["data"][:7]
-        if mes not in usd_mensal:
-            usd_mensal[mes] = []
-        usd_mensal[mes].append(item["valor"])
-    usd_mensal_avg = {k: sum(v) / len(v) for k, v in usd_mensal.items()}
+        if mes not in por_mes:
+            por_mes[mes] = []
+        por_mes[mes].append(item["valor"])
+    return [{"data": k, "valor": round(sum(v) / len(v), 4)} for k, v in sorted(por_mes.items())]
 
-    selic_mensal = {}
-    for item in selic:
-        mes = item["data"][:7]
-        selic_mensal[mes] = item["valor"]  # última do mês
 
+def _ultimo_mensal(serie: list) -> list:
+    """Último valor de cada mês (yyyy-mm)."""
+    por_mes = {}
+    for item in serie:
+        por_mes[item["data"][:7]] = item["valor"]
+    return [{"data": k, "valor": v} for k, v in sorted(por_mes.items())]
+
+
+def _somas_moveis(valores, janela: int):
+    """Soma de cada janela [k, k + janela) via soma acumulada (O(n))."""
+    acumulado = np.concatenate(([0.0], np.cumsum(valores)))
+    return acumulado[janela:] - acumulado[:-janela]
+
+
+def _perto_de_empate(valor: float, casas: int) -> bool:
+    """Indica se round(valor, casas) é sensível a erro de ponto flutuante."""
+    return abs(abs(valor * 10 ** casas) % 1 - 0.5) < 1e-3
+
+
+def _arredondar_conferindo(valores: list, casas: int, referencia: Callable) -> list:
+    """
+    round() de cada valor. Quando o valor cai perto de um empate de
+    arredondamento, o erro da soma acumulada poderia trocar o dígito final;
+    nesses poucos pontos o valor é recalculado por referencia(k), com a
+    mesma conta do motor python. O mesmo vale para valores que arredondam
+    para zero, onde o erro decidiria entre 0.0 e -0.0.
+    """
+    arredondados = []
+    for k, valor in enumerate(valores):
+        if _perto_de_empate(valor, casas) or round(valor, casas) == 0:
+            valor = referencia(k)
+        arredondados.append(round(valor, casas))
+    return arredondados
+
+
+def _exigir_numpy() -> None:
+    if np is None:
+        raise RuntimeError("motor numpy requer o pacote numpy (pip install numpy)")
+
+
+def _retornos_numpy(serie: list) -> list:
+    _exigir_numpy()
+    precos = np.array([u["valor"] for u in serie], dtype=np.float64)
+    anteriores, atuais = precos[:-1], precos[1:]
+    validos = np.flatnonzero(anteriores != 0)
+    variacoes = ((atuais[validos] - anteriores[validos]) / anteriores[validos]) * 100
+    return [
+        {"data": serie[i + 1]["data"], "valor": round(v, 4)}
+        for i, v in zip(validos.tolist(), variacoes.tolist())
+    ]
+
+
+def _volatilidade_movel_30d_numpy(retornos: list) -> list:
+    """Janela retornos[i-30:i] por soma acumulada: variância = E[x²] - E[x]²."""
+    _exigir_numpy()
+    if len(retornos) <= 30:
+        return []
+    lista_r = [item["valor"] for item in retornos]
+    r = np.array(lista_r, dtype=np.float64)
+    r = r - r.mean()  # centraliza para reduzir cancelamento numérico
+    medias = _somas_moveis(r, 30)[:-1] / 30
+    variancias = np.maximum(_somas_moveis(r * r, 30)[:-1] / 30 - medias * medias, 0.0)
+
+    def vol_referencia(k):
+        janela = lista_r[k:k + 30]
+        media = sum(janela) / len(janela)
+        return (sum((x - media) ** 2 for x in janela) / len(janela)) ** 0.5
+
+    valores = _arredondar_conferindo(np.sqrt(variancias).tolist(), 4, vol_referencia)
+    return [{"data": retornos[k + 30]["data"], "valor": v} for k, v in enumerate(valores)]
+
+
+def _media_movel_30d_numpy(serie: list) -> list:
+    _exigir_numpy()
+    if len(serie) < 30:
+        return []
+    lista_p = [item["valor"] for item in serie]
+    precos = np.array(lista_p, dtype=np.float64)
+    centro = precos.mean()
+    medias = _somas_moveis(precos - centro, 30) / 30 + centro
+    valores = _arredondar_conferindo(medias.tolist(), 4, lambda k: sum(lista_p[k:k + 30]) / 30)
+    return [{"data": serie[k + 29]["data"], "valor": v} for k, v in enumerate(valores)]
+
+
+def _acumulado_12m_numpy(serie: list) -> list:
+    """O produto de 12 fatores vira soma móvel de log1p."""
+    _exigir_numpy()
+    if len(serie) < 12:
+        return []
+    taxas = [item["valor"] for item in serie]
+    logs = np.log1p(np.array(taxas, dtype=np.float64) / 100)
+    acumulados = np.expm1(_somas_moveis(logs, 12)) * 100
+
+    def acumulado_referencia(k):
+        acum = 1.0
+        for taxa in taxas[k:k + 12]:
+            acum *= (1 + taxa / 100)
+        return (acum - 1) * 100
+
+    valores = _arredondar_conferindo(acumulados.tolist(), 2, acumulado_referencia)
+    return [{"data": serie[k + 11]["data"], "valor": v} for k, v in enumerate(valores)]
+
+
+# Registro de cálculos: motor -> função, o cálculo do qual depende (opcional) e
+# o alcance de cada ponto de saída, usado no recálculo incremental:
+# - contexto: quantos pontos de entrada anteriores a janela usa; a saída da
+#   posição i existe a partir de i = contexto
+# - por_mes: um ponto por mês, calculado só com os pontos daquele mês
+CALCULOS_DERIVADOS = {
+    "retornos": {"python": _retornos, "numpy": _retornos_numpy, "contexto": 1},
+    "volatilidade_movel_30d": {
+        "depende_de": "retornos",
+        "python": _volatilidade_movel_30d,
+        "numpy": _volatilidade_movel_30d_numpy,
+        "contexto": 30,
+    },
+    "media_movel_30d": {"python": _media_movel_30d, "numpy": _media_movel_30d_numpy, "contexto": 29},
+    "acumulado_12m": {"python": _acumulado_12m, "numpy": _acumulado_12m_numpy, "contexto": 11},
+    "media_mensal": {"python": _media_mensal, "por_mes": True},
+    "ultimo_mensal": {"python": _ultimo_mensal, "por_mes": True},
+}
+
+
+def _posicao(serie: list, data: str) -> int:
+    """Primeira posição de `serie` (ordenada) com data >= `data`."""
+    return bisect_left(serie, data, key=lambda item: item["data"])
+
+
+def atualizar_cauda(definicao: dict, funcao: Callable, antiga: list, entrada: list,
+                    corte: str) -> list:
+    """
+    Refaz a derivada `antiga`, calculada quando a entrada terminava em `corte`,
+    para a `entrada` atual: só os pontos afetados pelos dados posteriores ao
+    corte são recalculados, e o início é cortado como num recálculo completo
+    (a janela de histórico anda para frente). O resultado é idêntico a
+    funcao(entrada), desde que os pontos até o corte não tenham mudado.
+    """
+    inicio_novos = len(entrada)
+    while inicio_novos > 0 and entrada[inicio_novos - 1]["data"] > corte:
+        inicio_novos -= 1
+
+    if definicao.get("por_mes"):
+        if not entrada:
+            return []
+        # o primeiro mês pode ter perdido pontos no corte da janela; os meses
+        # a partir do primeiro ponto novo ganharam pontos
+        primeiro_mes = entrada[0]["data"][:7]
+        fim_primeiro = 0
+        while fim_primeiro < len(entrada) and entrada[fim_primeiro]["data"][:7] == primeiro_mes:
+            fim_primeiro += 1
+        inicio_afetado = inicio_novos
+        if inicio_novos < len(entrada):
+            mes_novo = entrada[inicio_novos]["data"][:7]
+            while inicio_afetado > 0 and entrada[inicio_afetado - 1]["data"][:7] == mes_novo:
+                inicio_afetado -= 1
+        if inicio_afetado <= fim_primeiro:
+            return funcao(entrada)
+        recalculados = funcao(entrada[:fim_primeiro] + entrada[inicio_afetado:])
+        fim_mantidos = len(antiga)
+        if inicio_afetado < len(entrada):
+            fim_mantidos = _posicao(antiga, entrada[inicio_afetado]["data"][:7])
+        mantidos = [m for m in antiga[_posicao(antiga, primeiro_mes):fim_mantidos] if m["data"] != primeiro_mes]
+        return recalculados[:1] + mantidos + recalculados[1:]
+
+    contexto = definicao["contexto"]
+    if len(entrada) <= contexto:
+        return []
+    novos = []
+    if inicio_novos < len(entrada):
+        novos = funcao(entrada[max(inicio_novos - contexto, 0):])
+    if inicio_novos <= contexto:
+        return novos
+    # as derivadas salvas só vão até o corte: basta cortar o início
+    return antiga[_posicao(antiga, entrada[contexto]["data"]):] + novos
+
+
+class CalculadoraDerivadas:
+    """
+    Calcula sob demanda as derivadas declaradas em SERIES[nome]["derivadas"]
+    (chave de saída -> cálculo). Cada (série, cálculo) é memoizado: pedir a
+    volatilidade reaproveita os retornos já calculados, e séries ou chaves
+    que ninguém pede nunca são calculadas.
+
+    Modo incremental: com `salvas` (o series_derivadas.json anterior) e
+    `cortes` (série -> última data que as derivadas salvas já cobrem), cada
+    derivada é refeita por atualizar_cauda só a partir dos pontos novos.
+    Séries sem corte são recalculadas inteiras.
+    """
+
+    def __init__(self, series: dict, motor: str = "python", registro: Optional[dict] = None,
+                 salvas: Optional[dict] = None, cortes: Optional[dict] = None):
+        self.series = series
+        self.motor = motor
+        self.registro = SERIES if registro is None else registro
+        self.cortes = cortes or {}
+        self._memo = {}
+        self._salvas = {
+            origem: salvas[chave] for chave, origem in self.saidas().items()
+            if salvas and chave in salvas
+        }
+
+    def obter(self, nome: str, calculo: str) -> list:
+        chave = (nome, calculo)
+        if chave not in self._memo:
+            definicao = CALCULOS_DERIVADOS[calculo]
+            funcao = definicao.get(self.motor, definicao["python"])
+            dependencia = definicao.get("depende_de")
+            entrada = self.obter(nome, dependencia) if dependencia else self.series[nome]
+            if chave in self._salvas and self.cortes.get(nome):
+                self._memo[chave] = atualizar_cauda(
+                    definicao, funcao, self._salvas[chave], entrada, self.cortes[nome]
+                )
+            else:
+                self._memo[chave] = funcao(entrada)
+        return self._memo[chave]
+
+    def saidas(self) -> dict:
+        """Chave de saída -> (série, cálculo), na ordem de series_derivadas.json."""
+        mapa = {}
+        for nome in self.series:
+            for chave, calculo in self.registro.get(nome, {}).get("derivadas", {}).items():
+                mapa[chave] = (nome, calculo)
+        ordem = [c for c in CHAVES_DERIVADAS if c in mapa] + [c for c in mapa if c not in CHAVES_DERIVADAS]
+        return {chave: mapa[chave] for chave in ordem}
+
+    def saida(self, chaves: Optional[Iterable] = None) -> dict:
+        """Calcula apenas as chaves pedidas (todas as declaradas, por padrão)."""
+        saidas = self.saidas()
+        pedidas = set(saidas if chaves is None else chaves)
+        return {chave: self.obter(*saidas[chave]) for chave in saidas if chave in pedidas}
+
+
+def cobertura_series(series: dict) -> dict:
+    """Primeira e última data de cada série (o que as derivadas salvas cobrem)."""
     return {
-        "retornos_diarios_usd": retornos_usd,
-        "volatilidade_movel_30d": vol_movel,
-        "ipca_acumulado_12m_rolling": ipca_acum_12m,
-        "media_movel_30d_usd": mm30_usd,
-        "usd_mensal_avg": [{"data": k, "valor": round(v, 4)} for k, v in sorted(usd_mensal_avg.items())],
-        "selic_mensal": [{"data": k, "valor": v} for k, v in sorted(selic_mensal.items())],
+        nome: {"primeira": serie[0]["data"], "ultima": serie[-1]["data"]}
+        for nome, serie in series.items() if serie
+    }
+
+
+def cortes_incrementais(cobertura: dict, series: dict) -> dict:
+    """
+    Série -> corte para CalculadoraDerivadas, só para as séries em que um
+    recálculo da cauda equivale ao completo: o início não recuou (janela
+    maior ou série rebaixada) e o último ponto coberto continua na série.
+    As demais ficam de fora e são recalculadas inteiras.
+    """
+    cortes = {}
+    for nome, serie in series.items():
+        anterior = cobertura.get(nome)
+        if not anterior or not serie or serie[0]["data"] < anterior["primeira"]:
+            continue
+        ultima = anterior["ultima"]
+        posicao = _posicao(serie, ultima)
+        if ultima < serie[0]["data"] or (posicao < len(serie) and serie[posicao]["data"] == ultima):
+            cortes[nome] = ultima
+    return cortes
+
+
+def carregar_estado_derivadas(path: str = ESTADO_DERIVADAS_PATH) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar_estado_derivadas(cobertura: dict, path: str = ESTADO_DERIVADAS_PATH,
+                            escritor: Optional[EscritorArtefatos] = None) -> None:
+    _gravar_json(path, cobertura, escritor, indent=None)
+
+
+def _processar_e_derivar(nome: str, raw: Optional[list], processados: Optional[list],
+                         motor: str) -> tuple[list, dict]:
+    """Trabalho de um processo: parse (se vier raw) + derivadas da série."""
+    if processados is None:
+        processados = processar_serie_rapido(raw, verbose=False)
+    return processados, CalculadoraDerivadas({nome: processados}, motor).saida()
+
+
+def processar_series_paralelo(nomes: list, raws: Optional[dict] = None,
+                              processados: Optional[dict] = None,
+                              max_processos: Optional[int] = None,
+                              motor: str = "python") -> tuple[dict, dict]:
+    """
+    Distribui parse e derivadas por série entre processos. Recebe os
+    payloads brutos (`raws`) ou as séries já processadas (`processados`).
+    Os resultados são montados na ordem de `nomes` e as derivadas na ordem
+    de CHAVES_DERIVADAS, então a saída é idêntica à do caminho sequencial.
+    """
+    raws, processados = raws or {}, processados or {}
+    with ProcessPoolExecutor(max_workers=max_processos) as executor:
+        futuros = [
+            executor.submit(_processar_e_derivar, nome, raws.get(nome), processados.get(nome), motor)
+            for nome in nomes
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+
+    series = {nome: serie for nome, (serie, _) in zip(nomes, resultados)}
+    partes = {}
+    for _, derivadas in resultados:
+        partes.update(derivadas)
+    ordem = CalculadoraDerivadas(series).saidas()
+    return series, {chave: partes[chave] for chave in ordem if chave in partes}
+
+
+class JanelaMovel:
+    """
+    Janela deslizante de tamanho fixo com média e variância populacional
+    atualizadas em O(1) (Welford com remoção do valor que sai da janela).
+    """
+
+    def __init__(self, tamanho: int, valores: Optional[list] = None):
+        self.tamanho = tamanho
+        self.valores = deque(maxlen=tamanho)
+        self.media = 0.0
+        self.m2 = 0.0  # soma dos quadrados dos desvios
+        for valor in valores or []:
+            self.adicionar(valor)
+
+    @property
+    def cheia(self) -> bool:
+        return len(self.valores) == self.tamanho
+
+    def adicionar(self, valor: float) -> None:
+        if self.cheia:
+            saindo = self.valores[0]
+            self.valores.append(valor)
+            media_anterior = self.media
+            self.media += (valor - saindo) / self.tamanho
+            self.m2 += (valor - saindo) * (valor - self.media + saindo - media_anterior)
+        else:
+            self.valores.append(valor)
+            delta = valor - self.media
+            self.media += delta / len(self.valores)
+            self.m2 += delta * (valor - self.media)
+
+    def desvio(self) -> float:
+        return (max(self.m2, 0.0) / len(self.valores)) ** 0.5
+
+    def media_exata(self) -> float:
+        """Média com a mesma conta do motor python (usada nos quase-empates)."""
+        return sum(self.valores) / len(self.valores)
+
+    def desvio_exato(self) -> float:
+        media = self.media_exata()
+        return (sum((v - media) ** 2 for v in self.valores) / len(self.valores)) ** 0.5
+
+
+class EstadoUsdStreaming:
+    """
+    Estado das séries derivadas do USD/BRL que dependem só da cauda:
+    retorno diário, volatilidade móvel 30d (sobre os 30 retornos anteriores)
+    e média móvel 30d (incluindo o ponto atual). Cada nova cotação custa O(1).
+    """
+
+    def __init__(self):
+        self.ultimo = None  # último ponto {"data", "valor"} consumido
+        self.retornos = JanelaMovel(30)
+        self.precos = JanelaMovel(30)
+
+    @classmethod
+    def a_partir_da_serie(cls, usd: list) -> "EstadoUsdStreaming":
+        estado = cls()
+        for item in usd:
+            estado.atualizar(item["data"], item["valor"])
+        return estado
+
+    def atualizar(self, data: str, valor: float) -> dict:
+        """Consome uma cotação e devolve os novos pontos de cada série (ou None)."""
+        novos = {"retornos_diarios_usd": None, "volatilidade_movel_30d": None, "media_movel_30d_usd": None}
+
+        if self.ultimo is not None and self.ultimo["valor"] != 0:
+            anterior = self.ultimo["valor"]
+            retorno = round(((valor - anterior) / anterior) * 100, 4)
+            novos["retornos_diarios_usd"] = {"data": data, "valor": retorno}
+            if self.retornos.cheia:
+                vol = self.retornos.desvio()
+                if _perto_de_empate(vol, 4) or round(vol, 4) == 0:
+                    vol = self.retornos.desvio_exato()
+                novos["volatilidade_movel_30d"] = {"data": data, "valor": round(vol, 4)}
+            self.retornos.adicionar(retorno)
+
+        self.precos.adicionar(valor)
+        if self.precos.cheia:
+            media = self.precos.media
+            if _perto_de_empate(media, 4) or round(media, 4) == 0:
+                media = self.precos.media_exata()
+            novos["media_movel_30d_usd"] = {"data": data, "valor": round(media, 4)}
+
+        self.ultimo = {"data": data, "valor": valor}
+        return novos
+
+    def para_dict(self) -> dict:
+        return {
+            "ultimo": self.ultimo,
+            "retornos": list(self.retornos.valores),
+            "precos": list(self.precos.valores),
+        }
+
+    @classmethod
+    def de_dict(cls, dados: dict) -> "EstadoUsdStreaming":
+        # médias e M2 são refeitas a partir das janelas para não acumular deriva
+        estado = cls()
+        estado.ultimo = dados["ultimo"]
+        estado.retornos = JanelaMovel(30, dados["retornos"])
+        estado.precos = JanelaMovel(30, dados["precos"])
+        return estado
+
+
+def carregar_estado_streaming(path: str = ESTADO_STREAMING_PATH) -> Optional[EstadoUsdStreaming]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return EstadoUsdStreaming.de_dict(json.load(f))
+
+
+def salvar_estado_streaming(estado: EstadoUsdStreaming, path: str = ESTADO_STREAMING_PATH,
+                            escritor: Optional[EscritorArtefatos] = None) -> None:
+    _gravar_json(path, estado.para_dict(), escritor, indent=None)
+
+
+def atualizar_derivadas_usd_streaming(derivadas: dict, estado: EstadoUsdStreaming,
+                                      usd: list) -> dict:
+    """
+    Alimenta o estado com as cotações de `usd` posteriores a estado.ultimo,
+    anexa os pontos gerados às séries derivadas salvas e corta o início
+    delas para coincidir com um recálculo completo sobre `usd`.
+    """
+    chaves = ("retornos_diarios_usd", "volatilidade_movel_30d", "media_movel_30d_usd")
+    for item in usd:
+        if item["data"] <= estado.ultimo["data"]:
+            continue
+        for chave, ponto in estado.atualizar(item["data"], item["valor"]).items():
+            if ponto is not None:
+                derivadas[chave].append(ponto)
+
+    if usd:
+        retornos = [r for r in derivadas["retornos_diarios_usd"] if r["data"] > usd[0]["data"]]
+        derivadas["retornos_diarios_usd"] = retornos
+        inicio_vol = retornos[30]["data"] if len(retornos) > 30 else None
+        derivadas["volatilidade_movel_30d"] = [
+            v for v in derivadas["volatilidade_movel_30d"]
+            if inicio_vol is not None and v["data"] >= inicio_vol
+        ]
+        inicio_mm = usd[29]["data"] if len(usd) >= 30 else None
+        derivadas["media_movel_30d_usd"] = [
+            m for m in derivadas["media_movel_30d_usd"]
+            if inicio_mm is not None and m["data"] >= inicio_mm
+        ]
+    return {chave: derivadas[chave] for chave in chaves}
+
+
+# Resoluções agregadas: período -> rótulo do balde a partir da data ISO.
+# "ordem" evita agregar uma série numa resolução que não é mais grossa que
+# a sua frequência (IPCA mensal só ganha a trimestral).
+ORDEM_FREQUENCIAS = {"diaria": 0, "semanal": 1, "mensal": 2, "trimestral": 3}
+
+
+def _rotulo_semana(data: str) -> str:
+    ano, semana, _ = date.fromisoformat(data[:10]).isocalendar()
+    return f"{ano}-W{semana:02d}"
+
+
+RESOLUCOES = {
+    "semanal": _rotulo_semana,
+    "mensal": lambda data: data[:7],
+    "trimestral": lambda data: f"{data[:4]}-T{(int(data[5:7]) - 1) // 3 + 1}",
+}
+
+
+def agregar_ohlc(serie: list, rotulo: Callable) -> list:
+    """
+    Um ponto por período: abertura, máxima, mínima, fechamento e média
+    ("valor", para os gráficos que já leem data/valor) dos pontos do período.
+    """
+    agregados = []
+    for item in serie:
+        periodo = rotulo(item["data"])
+        valor = item["valor"]
+        if not agregados or agregados[-1]["data"] != periodo:
+            agregados.append({
+                "data": periodo, "valor": valor, "abertura": valor, "maxima": valor,
+                "minima": valor, "fechamento": valor, "pontos": 0, "_soma": 0.0,
+            })
+        atual = agregados[-1]
+        atual["maxima"] = max(atual["maxima"], valor)
+        atual["minima"] = min(atual["minima"], valor)
+        atual["fechamento"] = valor
+        atual["pontos"] += 1
+        atual["_soma"] += valor
+    for atual in agregados:
+        atual["valor"] = round(atual.pop("_soma") / atual["pontos"], 4)
+    return agregados
+
+
+def _ordinal(data: str) -> int:
+    """Dia ordinal de uma data ISO (yyyy-mm-dd ou yyyy-mm)."""
+    return date.fromisoformat(data if len(data) == 10 else f"{data}-01").toordinal()
+
+
+def lttb(serie: list, limite: int = PONTOS_LTTB) -> list:
+    """
+    Largest-Triangle-Three-Buckets: reduz a série a `limite` pontos mantendo
+    o primeiro, o último e, em cada balde, o ponto que forma o maior
+    triângulo com o ponto escolhido antes e a média do balde seguinte. Preserva
+    picos e vales que uma média por período apagaria.
+    """
+    n = len(serie)
+    if limite >= n or limite < 3:
+        return list(serie)
+    x = [_ordinal(item["data"]) for item in serie]
+    y = [item["valor"] for item in serie]
+    passo = (n - 2) / (limite - 2)
+    amostra = [serie[0]]
+    anterior = 0
+    for i in range(limite - 2):
+        inicio, fim = int(i * passo) + 1, int((i + 1) * passo) + 1
+        prox_inicio, prox_fim = fim, min(int((i + 2) * passo) + 1, n)
+        media_x = sum(x[prox_inicio:prox_fim]) / (prox_fim - prox_inicio)
+        media_y = sum(y[prox_inicio:prox_fim]) / (prox_fim - prox_inicio)
+        escolhido, maior_area = inicio, -1.0
+        for j in range(inicio, fim):
+            area = abs((x[anterior] - media_x) * (y[j] - y[anterior])
+                       - (x[anterior] - x[j]) * (media_y - y[anterior]))
+            if area > maior_area:
+                escolhido, maior_area = j, area
+        amostra.append(serie[escolhido])
+        anterior = escolhido
+    amostra.append(serie[-1])
+    return amostra
+
+
+def calcular_resolucoes(series: dict, derivadas: dict, registro: Optional[dict] = None,
+                        limite_lttb: int = PONTOS_LTTB) -> dict:
+    """
+    Pirâmide de resoluções para o dashboard, um dicionário por arquivo:
+    semanal/mensal/trimestral com OHLC + média de cada série, e
+    lttb_<limite> com séries e derivadas reduzidas a `limite_lttb` pontos.
+    """
+    registro = SERIES if registro is None else registro
+    resolucoes = {}
+    for resolucao, rotulo in RESOLUCOES.items():
+        resolucoes[resolucao] = {
+            nome: agregar_ohlc(serie, rotulo) for nome, serie in series.items()
+            if ORDEM_FREQUENCIAS[resolucao] > ORDEM_FREQUENCIAS[registro[nome].get("frequencia", "diaria")]
+        }
+    resolucoes[f"lttb_{limite_lttb}"] = {
+        nome: lttb(serie, limite_lttb) for nome, serie in {**series, **derivadas}.items()
     }
+    return resolucoes
+
+
+def salvar_resolucoes(resolucoes: dict, diretorio: str = RESOLUCOES_DIR,
+                      escritor: Optional[EscritorArtefatos] = None) -> list:
+    paths = []
+    for resolucao, series in resolucoes.items():
+        path = os.path.join(diretorio, f"{resolucao}.json")
+        _gravar_json(path, series, escritor)
+        paths.append(path)
+    return paths
+
 
+def artefatos_publicaveis(origem: str = OUTPUT_DIR) -> list:
+    """JSON consumidos pelo dashboard (caminhos relativos a `origem`), sem estado interno."""
+    artefatos = []
+    for subdir in ("", os.path.basename(RESOLUCOES_DIR)):
+        diretorio = os.path.join(origem, subdir)
+        if not os.path.isdir(diretorio):
+            continue
+        for nome in sorted(os.listdir(diretorio)):
+            if nome.endswith(".json") and not nome.startswith("_") and nome != os.path.basename(METRICAS_PATH):
+                artefatos.append(os.path.join(subdir, nome) if subdir else nome)
+    return artefatos
 
-def main():
-    """Pipeline principal de ingestão e processamento."""
+
+def _variantes_compactadas() -> dict:
+    """Extensão -> compressor. A saída do gzip é determinística (mtime=0)."""
+    variantes = {".gz": lambda conteudo: gzip.compress(conteudo, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes[".br"] = lambda conteudo: brotli.compress(conteudo, quality=11)
+    return variantes
+
+
+def _carregar_manifesto(path: str) -> Optional[dict]:
+    """Artefatos do manifest.json anterior ({} se não existe, None se ilegível)."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            artefatos = json.load(f)["artefatos"]
+        if all(isinstance(entrada["arquivo"], str) for entrada in artefatos.values()):
+            return artefatos
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    print(f"[PUBLICAR] Manifesto {path} ilegível, tratado como vazio")
+    return None
+
+
+def publicar_artefatos(origem: str = OUTPUT_DIR, destino: str = PUBLICACAO_DIR) -> dict:
+    """
+    Grava cada artefato minificado com o hash do conteúdo no nome
+    (kpis.<sha256[:12]>.json) e as variantes .gz/.br ao lado, para servir
+    com cache longo (immutable). Arquivos cujo nome com hash já existe não
+    são regravados nem recomprimidos. manifest.json mapeia o nome lógico
+    para os arquivos publicados; versões que não estão nem no manifesto
+    novo nem no anterior são removidas. Com o manifesto anterior ilegível
+    não se sabe o que ainda é servido, então nada é removido nessa rodada.
+    """
+    os.makedirs(destino, exist_ok=True)
+    manifesto_path = os.path.join(destino, "manifest.json")
+    anterior = _carregar_manifesto(manifesto_path)
+
+    variantes = _variantes_compactadas()
+    escritor = EscritorArtefatos()
+    artefatos, novos = {}, 0
+    for relativo in artefatos_publicaveis(origem):
+        with open(os.path.join(origem, relativo), encoding="utf-8") as f:
+            conteudo = json.dumps(json.load(f), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        sha = hashlib.sha256(conteudo).hexdigest()
+        arquivo = f"{os.path.splitext(relativo)[0]}.{sha[:12]}.json"
+        entrada = {"arquivo": arquivo, "sha256": sha, "bytes": len(conteudo)}
+        path = os.path.join(destino, arquivo)
+        if not os.path.exists(path):
+            novos += 1
+            escritor.adicionar(path, lambda conteudo=conteudo: conteudo)
+        for extensao, comprimir in variantes.items():
+            if not os.path.exists(path + extensao):
+                # a compressão roda no pool do escritor (zlib/brotli liberam o GIL)
+                escritor.adicionar(
+                    path + extensao, lambda conteudo=conteudo, comprimir=comprimir: comprimir(conteudo)
+                )
+            entrada[extensao.lstrip(".")] = {"arquivo": arquivo + extensao}
+        artefatos[relativo] = entrada
+    escritor.gravar()
+
+    # o manifesto só é gravado depois: aponta apenas para arquivos completos
+    for entrada in artefatos.values():
+        for extensao in variantes:
+            variante = entrada[extensao.lstrip(".")]
+            variante["bytes"] = os.path.getsize(os.path.join(destino, variante["arquivo"]))
+    _gravar_json(
+        manifesto_path,
+        {"gerado_em": datetime.now().isoformat(timespec="seconds"), "artefatos": artefatos},
+    )
+
+    referenciados = {manifesto_path}
+    for entrada in [*artefatos.values(), *(anterior or {}).values()]:
+        referenciados.add(os.path.join(destino, entrada["arquivo"]))
+        for extensao in (".gz", ".br"):
+            referenciados.add(os.path.join(destino, entrada["arquivo"] + extensao))
+    for raiz, _, nomes in os.walk(destino):
+        for nome in nomes:
+            path = os.path.join(raiz, nome)
+            if anterior is not None and path not in referenciados:
+                os.remove(path)
+
+    print(f"[PUBLICAR] {len(artefatos)} artefatos em {destino} "
+          f"({novos} novos, {len(artefatos) - novos} inalterados"
+          f"{'' if brotli is not None else ', sem brotli instalado'})")
+    return artefatos
+
+
+def atualizar_derivadas_incremental(series: dict, recebidos: dict, motor: str,
+                                    derivadas_salvas: dict, cobertura: Optional[dict],
+                                    estado: Optional[EstadoUsdStreaming]
+                                    ) -> Optional[tuple[dict, EstadoUsdStreaming]]:
+    """
+    Refaz só a cauda das derivadas a partir de `derivadas_salvas` (cortes
+    por cobertura e, para o USD/BRL, o estado de streaming). Devolve
+    (derivadas, estado), ou None se nada puder ser aproveitado e o
+    recálculo tiver de ser completo.
+    """
+    usd = series["usd_brl"]
+    cortes = cortes_incrementais(cobertura or {}, series)
+    # o estado só vale se o último ponto consumido ainda está na cauda da série
+    # e se as derivadas salvas cobrem o início dela (janela não recuou)
+    cauda = usd[-recebidos.get("usd_brl", 0) - 1:]
+    streaming = estado is not None and "usd_brl" in cortes and estado.ultimo in cauda
+    if not streaming and not cortes:
+        return None
+
+    calculadora = CalculadoraDerivadas(series, motor, salvas=derivadas_salvas, cortes=cortes)
+    print(f"[DERIVADAS] Recalculando só a cauda de: {', '.join(cortes) or 'nenhuma série'}"
+          f"{' (USD/BRL via streaming)' if streaming else ''}")
+    via_streaming = (
+        atualizar_derivadas_usd_streaming(derivadas_salvas, estado, usd) if streaming else {}
+    )
+    derivadas = {
+        chave: via_streaming[chave] if chave in via_streaming else calculadora.obter(*origem)
+        for chave, origem in calculadora.saidas().items()
+    }
+    if not streaming:
+        estado = EstadoUsdStreaming.a_partir_da_serie(usd)
+    return derivadas, estado
+
+
+def atualizar_artefatos(series: dict, recebidos: dict, watermarks: dict,
+                        motor: str = "python",
+                        derivadas_salvas: Optional[dict] = None, cobertura: Optional[dict] = None,
+                        estado: Optional[EstadoUsdStreaming] = None, processos: int = 0,
+                        derivadas_paralelo: Optional[dict] = None, publicar: bool = False,
+                        prometheus_path: Optional[str] = None) -> tuple[dict, dict, EstadoUsdStreaming]:
+    """
+    Passos 2 a 5 do pipeline a partir das séries já processadas: KPIs,
+    derivadas, resoluções e gravação em lote (e publicação/métricas). Com
+    `derivadas_salvas` + `cobertura` (e o `estado` de streaming do USD/BRL),
+    as derivadas são atualizadas só na cauda. `recebidos` é o número de
+    registros novos por série. Devolve (kpis, derivadas, estado).
+    """
+    # 2. Séries processadas. Os artefatos só vão para o disco no fim, juntos
+    # e de forma atômica; os watermarks por último, para nunca passarem à
+    # frente das séries gravadas.
+    escritor = EscritorArtefatos()
+    for nome, dados in series.items():
+        escritor.adicionar_json(os.path.join(OUTPUT_DIR, f"{nome}.json"), dados)
+        METRICAS.somar(nome, "salvar", registros=len(dados))
+        if dados:
+            watermarks[nome] = dados[-1]["data"]
+
+    # 3. Calcular KPIs
+    print("\n[KPIs] Calculando indicadores...")
+    with METRICAS.etapa("kpis"):
+        kpis = calcular_kpis(series["selic"], series["usd_brl"], series["ipca"])
+    escritor.adicionar_json(os.path.join(OUTPUT_DIR, "kpis.json"), kpis)
+
+    # 4. Calcular séries derivadas
+    derivadas_path = os.path.join(OUTPUT_DIR, "series_derivadas.json")
+    with METRICAS.etapa("derivadas"):
+        usd = series["usd_brl"]
+        incremental = (
+            atualizar_derivadas_incremental(series, recebidos, motor, derivadas_salvas, cobertura, estado)
+            if derivadas_salvas is not None else None
+        )
+        if incremental is not None:
+            derivadas, estado = incremental
+        else:
+            print("[DERIVADAS] Calculando séries derivadas...")
+            if derivadas_paralelo is not None:
+                derivadas = derivadas_paralelo
+            elif processos:
+                _, derivadas = processar_series_paralelo(
+                    list(series), processados=series, max_processos=processos, motor=motor,
+                )
+            else:
+                derivadas = calcular_series_derivadas(series, motor=motor)
+            estado = EstadoUsdStreaming.a_partir_da_serie(usd)
+    escritor.adicionar_json(derivadas_path, derivadas)
+    salvar_estado_streaming(estado, escritor=escritor)
+    salvar_estado_derivadas(cobertura_series(series), escritor=escritor)
+    METRICAS.somar("_pipeline", "derivadas", registros=sum(len(v) for v in derivadas.values()))
+
+    # 5. Resoluções reduzidas para o dashboard
+    with METRICAS.etapa("resolucoes"):
+        resolucoes = calcular_resolucoes(series, derivadas)
+    salvar_resolucoes(resolucoes, escritor=escritor)
+    METRICAS.somar("_pipeline", "resolucoes", registros=sum(
+        len(pontos) for por_serie in resolucoes.values() for pontos in por_serie.values()
+    ))
+
+    # Gravação do lote: serialização em paralelo, temporário + os.replace
+    salvar_watermarks(watermarks, escritor=escritor)
+    with METRICAS.etapa("salvar"):
+        gravados = escritor.gravar()
+    for path, gravado in gravados.items():
+        print(f"[SAVE] {path}" if gravado else f"[SKIP] {path} (inalterado)")
+
+    if publicar:
+        with METRICAS.etapa("publicar"):
+            publicados = publicar_artefatos()
+        METRICAS.somar("_pipeline", "publicar", registros=len(publicados))
+
+    METRICAS.salvar_json()
+    print(f"[SAVE] {METRICAS_PATH}")
+    if prometheus_path:
+        METRICAS.salvar_prometheus(prometheus_path)
+        print(f"[SAVE] {prometheus_path}")
+
+    return kpis, derivadas, estado
+
+
+# Agenda do modo residente (--daemon), no horário de Brasília (sem horário de
+# verão desde 2019).
+FUSO_BCB = timezone(timedelta(hours=-3), "BRT")
+ESPERA_MAXIMA_S = 3600  # reavalia a agenda ao menos de hora em hora
+
+
+def _no_horario(dia: date, hora: int, minuto: int) -> datetime:
+    return datetime(dia.year, dia.month, dia.day, hora, minuto, tzinfo=FUSO_BCB)
+
+
+def _proximo_dia_util(dia: date) -> date:
+    while dia.weekday() >= 5:
+        dia += timedelta(days=1)
+    return dia
+
+
+def _proxima_diaria(depois: datetime) -> datetime:
+    """Dias úteis, após o fechamento da PTAX (~13h; a SELIC diária do dia anterior já saiu)."""
+    dia = depois.astimezone(FUSO_BCB).date()
+    while True:
+        dia = _proximo_dia_util(dia)
+        candidato = _no_horario(dia, 13, 30)
+        if candidato > depois:
+            return candidato
+        dia += timedelta(days=1)
+
+
+def _proxima_mensal(depois: datetime) -> datetime:
+    """IPCA: divulgado pelo IBGE por volta do dia 10, às 9h."""
+    local = depois.astimezone(FUSO_BCB)
+    ano, mes = local.year, local.month
+    while True:
+        candidato = _no_horario(date(ano, mes, 10), 9, 30)
+        if candidato > depois:
+            return candidato
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+
+# proxima: horário da próxima publicação; se na hora prevista ainda não houver
+# ponto novo, tenta de novo a cada `retentativa` até `tolerancia` após o previsto
+AGENDAS = {
+    "diaria": {"proxima": _proxima_diaria, "retentativa": timedelta(hours=1), "tolerancia": timedelta(hours=6)},
+    "mensal": {"proxima": _proxima_mensal, "retentativa": timedelta(hours=6), "tolerancia": timedelta(days=5)},
+}
+
+
+def reagendar(nome: str, instante: datetime, previsto: Optional[datetime],
+              recebidos: Optional[int]) -> tuple[datetime, datetime]:
+    """
+    Próxima execução da série depois de uma atualização em `instante` que
+    trouxe `recebidos` pontos novos (None = falhou). `previsto` é o horário
+    agendado que disparou a atualização (None na carga inicial).
+    Devolve (próxima execução, horário previsto dela).
+    """
+    agenda = AGENDAS[SERIES[nome]["agenda"]]
+    regular = agenda["proxima"](instante)
+    if not recebidos and previsto is not None:
+        tentativa = instante + agenda["retentativa"]
+        if tentativa <= previsto + agenda["tolerancia"] and tentativa < regular:
+            return tentativa, previsto
+    return regular, regular
+
+
+class ServicoAtualizacao:
+    """
+    Pipeline residente: a Session (pool keep-alive), o cache HTTP, o circuit
+    breaker, as séries processadas, as derivadas e o estado de streaming
+    ficam em memória entre atualizações. atualizar() busca só as séries
+    pedidas, a partir do último ponto em memória; as demais apenas acompanham
+    o deslizamento da janela.
+    """
+
+    def __init__(self, meses: int = MESES_HISTORICO, motor: str = "python",
+                 usar_cache: bool = True, max_concorrencia: int = MAX_CONCORRENCIA,
+                 prazo_serie: float = PRAZO_SERIE_S, publicar: bool = False,
+                 prometheus_path: Optional[str] = None, url_base: str = BCB_SGS_URL):
+        self.meses = meses
+        self.motor = motor
+        self.max_concorrencia = max_concorrencia
+        self.prazo_serie = prazo_serie
+        self.publicar = publicar
+        self.prometheus_path = prometheus_path
+        self.url_base = url_base
+        self.sessao = criar_sessao(max_concorrencia)
+        self.cache = CacheHttp() if usar_cache else None
+        self.disjuntor = DisjuntorSgs()
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        self.recarregar()
+
+    def recarregar(self) -> None:
+        """(Re)carrega de raw/ o estado gravado pela última atualização."""
+        self.series = {nome: carregar_serie_salva(nome) for nome in SERIES}
+        self.watermarks = carregar_watermarks()
+        self.derivadas = None
+        derivadas_path = os.path.join(OUTPUT_DIR, "series_derivadas.json")
+        if os.path.exists(derivadas_path):
+            with open(derivadas_path, encoding="utf-8") as f:
+                self.derivadas = json.load(f)
+        self.cobertura = carregar_estado_derivadas()
+        self.estado = carregar_estado_streaming()
+
+    def atualizar(self, nomes: list) -> dict:
+        """Atualiza as séries em `nomes` e regrava os artefatos. Devolve série -> pontos novos."""
+        METRICAS.reiniciar()
+        data_inicio, data_fim = calcular_janela(self.meses)
+        data_minima = datetime.strptime(data_inicio, "%d/%m/%Y").strftime("%Y-%m-%d")
+
+        def buscar(nome):
+            config = SERIES[nome]
+            print(f"[{nome.upper()}] Buscando série {config['codigo']} - {config['descricao']}")
+            prazo = time.monotonic() + self.prazo_serie
+            try:
+                with METRICAS.etapa("fetch", nome):
+                    n_recebidos, serie = buscar_incremental(
+                        nome, config["codigo"], data_inicio, data_fim, self.watermarks, self.sessao,
+                        self.cache, prazo, self.disjuntor, salva=self.series[nome],
+                        max_concorrencia=self.max_concorrencia, url_base=self.url_base,
+                    )
+            except SgsIndisponivel as erro:
+                if not self.series[nome]:
+                    raise
+                print(f"  [FALLBACK] {erro}; mantendo a série em memória")
+                return 0, mesclar_series(self.series[nome], [], data_minima)
+            METRICAS.somar(nome, "fetch", registros=n_recebidos)
+            return n_recebidos, serie
+
+        resultados = executar_por_serie(buscar, nomes, self.max_concorrencia)
+        recebidos, series = {}, {}
+        for nome in SERIES:
+            if nome in resultados:
+                recebidos[nome], series[nome] = resultados[nome]
+            else:
+                recebidos[nome], series[nome] = 0, mesclar_series(self.series[nome] or [], [], data_minima)
+
+        _, self.derivadas, self.estado = atualizar_artefatos(
+            series, recebidos, self.watermarks, self.motor,
+            self.derivadas, self.cobertura, self.estado,
+            publicar=self.publicar, prometheus_path=self.prometheus_path,
+        )
+        self.series = series
+        self.cobertura = cobertura_series(series)
+        return recebidos
+
+    def fechar(self) -> None:
+        self.sessao.close()
+
+
+def executar_daemon(servico: ServicoAtualizacao, parar: threading.Event,
+                    agora: Callable[[], datetime] = lambda: datetime.now(FUSO_BCB)) -> None:
+    """
+    Laço do modo residente: atualiza todas as séries na partida e depois
+    cada uma no horário da sua agenda, dormindo até a próxima (ou até
+    `parar` ser sinalizado). Uma falha não derruba o serviço: o estado é
+    recarregado do disco e a série entra em retentativa.
+    """
+    instante = agora()
+    proximas = {nome: instante for nome in SERIES}
+    previstos = {nome: None for nome in SERIES}
+    while not parar.is_set():
+        instante = agora()
+        vencidas = [nome for nome, quando in proximas.items() if quando <= instante]
+        if vencidas:
+            print(f"\n[DAEMON] {instante:%Y-%m-%d %H:%M} atualizando: {', '.join(vencidas)}")
+            try:
+                recebidos = servico.atualizar(vencidas)
+            except Exception as erro:
+                print(f"[DAEMON] Falha na atualização: {erro!r}")
+                servico.recarregar()
+                recebidos = {}
+            for nome in vencidas:
+                proximas[nome], previstos[nome] = reagendar(
+                    nome, instante, previstos[nome], recebidos.get(nome),
+                )
+            agenda = ", ".join(f"{nome} {quando:%d/%m %H:%M}" for nome, quando in sorted(
+                proximas.items(), key=lambda item: item[1]
+            ))
+            print(f"[DAEMON] Próximas: {agenda}")
+        espera = (min(proximas.values()) - agora()).total_seconds()
+        parar.wait(min(max(espera, 0), ESPERA_MAXIMA_S))
+
+
+def main(incremental: bool = False, max_concorrencia: int = MAX_CONCORRENCIA,
+         meses: int = MESES_HISTORICO, motor: str = "python",
+         usar_cache: bool = True, prometheus_path: Optional[str] = None,
+         stream: bool = False, processos: int = 0, publicar: bool = False,
+         prazo_serie: float = PRAZO_SERIE_S, url_base: str = BCB_SGS_URL):
+    """
+    Pipeline principal de ingestão e processamento. `url_base` aponta o
+    fetch para outro SGS (ex.: um stub local nos testes).
+    """
+    METRICAS.reiniciar()
     print("=" * 60)
     print("Pipeline de Dados - Banco Central do Brasil")
     print("=" * 60)
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    data_inicio, data_fim = calcular_janela()
-    print(f"\nJanela: {data_inicio} a {data_fim} ({MESES_HISTORICO} meses)\n")
+    data_inicio, data_fim = calcular_janela(meses)
+    print(f"\nJanela: {data_inicio} a {data_fim} ({meses} meses)\n")
 
-    # 1. Fetch das séries
-    dados_raw = {}
+    # 1. Fetch das séries (em paralelo, Session compartilhada)
+    recebidos = {}
     dados_processados = {}
-    for nome, config in SERIES.items():
+    watermarks = carregar_watermarks() if incremental else {}
+    sessao = criar_sessao(max_concorrencia)
+    cache = CacheHttp() if usar_cache else None
+    disjuntor = DisjuntorSgs()
+
+    def buscar(nome):
+        """Devolve (registros recebidos, série processada ou None, raw pendente de parse)."""
+        config = SERIES[nome]
         print(f"[{nome.upper()}] Buscando série {config['codigo']} - {config['descricao']}")
-        raw = fetch_serie(config["codigo"], data_inicio, data_fim)
-        dados_raw[nome] = raw
-        dados_processados[nome] = processar_serie(raw)
-        print()
-
-    # 2. Salvar séries processadas
-    for nome, dados in dados_processados.items():
-        path = os.path.join(OUTPUT_DIR, f"{nome}.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(dados, f, ensure_ascii=False, indent=2)
-        print(f"[SAVE] {path} ({len(dados)} registros)")
+        raw = None
+        prazo = time.monotonic() + prazo_serie
+        try:
+            if incremental:
+                with METRICAS.etapa("fetch", nome):
+                    n_recebidos, processados = buscar_incremental(
+                        nome, config["codigo"], data_inicio, data_fim, watermarks, sessao,
+                        cache, prazo, disjuntor, stream=stream, max_concorrencia=max_concorrencia,
+                        url_base=url_base,
+                    )
+            elif stream:
+                with METRICAS.etapa("fetch", nome):
+                    n_recebidos, processados = buscar_serie_stream(
+                        config["codigo"], data_inicio, data_fim, sessao, url_base,
+                        max_concorrencia=max_concorrencia, prazo=prazo, disjuntor=disjuntor,
+                    )
+            else:
+                with METRICAS.etapa("fetch", nome):
+                    raw = fetch_serie_em_blocos(
+                        config["codigo"], data_inicio, data_fim, sessao, url_base,
+                        max_concorrencia=max_concorrencia, cache=cache,
+                        prazo=prazo, disjuntor=disjuntor,
+                    )
+                n_recebidos = len(raw)
+                if processos:
+                    processados = None  # parse fica para o pool de processos
+                else:
+                    with METRICAS.etapa("processar", nome):
+                        processados = processar_serie_rapido(raw)
+        except SgsIndisponivel as erro:
+            # última série boa gravada; sem ela não há o que publicar
+            salva = carregar_serie_salva(nome)
+            if salva is None:
+                raise
+            print(f"  [FALLBACK] {erro}; mantendo a última série salva ({len(salva)} registros)")
+            return 0, salva, []
+        METRICAS.somar(nome, "fetch", registros=n_recebidos)
+        if processados is not None:
+            METRICAS.somar(nome, "processar", registros=len(processados))
+        return n_recebidos, processados, raw
 
-    # 3. Calcular KPIs
-    print("\n[KPIs] Calculando indicadores...")
-    kpis = calcular_kpis(
-        dados_processados["selic"],
-        dados_processados["usd_brl"],
-        dados_processados["ipca"],
-    )
-    kpi_path = os.path.join(OUTPUT_DIR, "kpis.json")
-    with open(kpi_path, "w", encoding="utf-8") as f:
-        json.dump(kpis, f, ensure_ascii=False, indent=2)
-    print(f"[SAVE] {kpi_path}")
+    with sessao:
+        resultados = executar_por_serie(buscar, list(SERIES), max_concorrencia)
+    pendentes = {}
+    for nome, (n_recebidos, processados, raw) in resultados.items():
+        recebidos[nome] = n_recebidos
+        dados_processados[nome] = processados
+        if processados is None:
+            pendentes[nome] = raw
 
-    # 4. Calcular séries derivadas
-    print("[DERIVADAS] Calculando séries derivadas...")
-    derivadas = calcular_series_derivadas(
-        dados_processados["selic"],
-        dados_processados["usd_brl"],
-        dados_processados["ipca"],
-    )
+    # Parse + derivadas por série em paralelo (--processos N); séries que já
+    # chegaram processadas (fallback para a última salva) só ganham as derivadas
+    derivadas_paralelo = None
+    if pendentes:
+        print(f"[PROCESSOS] Processando {len(pendentes)} séries em até {processos} processos")
+        with METRICAS.etapa("processar"):
+            dados_processados, derivadas_paralelo = processar_series_paralelo(
+                list(SERIES), raws=pendentes, max_processos=processos, motor=motor,
+                processados={nome: serie for nome, serie in dados_processados.items() if serie is not None},
+            )
+        for nome in pendentes:
+            METRICAS.somar(nome, "processar", registros=len(dados_processados[nome]))
+    print()
+
+    # 2-5. KPIs, derivadas, resoluções e gravação
+    derivadas_salvas, cobertura, estado = None, {}, None
     derivadas_path = os.path.join(OUTPUT_DIR, "series_derivadas.json")
-    with open(derivadas_path, "w", encoding="utf-8") as f:
-        json.dump(derivadas, f, ensure_ascii=False, indent=2)
-    print(f"[SAVE] {derivadas_path}")
+    if incremental and os.path.exists(derivadas_path):
+        with open(derivadas_path, encoding="utf-8") as f:
+            derivadas_salvas = json.load(f)
+        cobertura = carregar_estado_derivadas()
+        estado = carregar_estado_streaming()
+    kpis, _, _ = atualizar_artefatos(
+        dados_processados, recebidos, watermarks, motor,
+        derivadas_salvas, cobertura, estado, processos, derivadas_paralelo,
+        publicar, prometheus_path,
+    )
 
-    # 5. Resumo
+    # 6. Resumo
     print("\n" + "=" * 60)
     print("RESUMO DOS KPIs")
     print("=" * 60)
@@ -301,4 +2317,71 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Pipeline de dados BCB/SGS")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="busca só os pontos após o watermark de cada série e mescla com raw/*.json",
+    )
+    parser.add_argument(
+        "--concorrencia", type=int, default=MAX_CONCORRENCIA,
+        help=f"máximo de requisições simultâneas ao SGS (padrão: {MAX_CONCORRENCIA})",
+    )
+    parser.add_argument(
+        "--meses", type=int, default=MESES_HISTORICO,
+        help=f"tamanho da janela de histórico em meses (padrão: {MESES_HISTORICO})",
+    )
+    parser.add_argument(
+        "--motor", choices=["python", "numpy"], default="python",
+        help="motor das séries derivadas: python (referência) ou numpy (vetorizado)",
+    )
+    parser.add_argument(
+        "--sem-cache", action="store_true",
+        help="ignora o cache HTTP em raw/_cache_http e sempre consulta o SGS",
+    )
+    parser.add_argument(
+        "--prometheus", metavar="ARQ",
+        help="grava as métricas também no formato texto do Prometheus (ex.: .../textfile/bcb.prom)",
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="decodifica as respostas do SGS em streaming (memória constante no payload bruto)",
+    )
+    parser.add_argument(
+        "--processos", type=int, default=0,
+        help="processa e deriva as séries num pool de N processos (0 = sequencial)",
+    )
+    parser.add_argument(
+        "--prazo", type=float, default=PRAZO_SERIE_S, metavar="SEGUNDOS",
+        help=f"tempo máximo de fetch por série, com retentativas (padrão: {PRAZO_SERIE_S:.0f}s)",
+    )
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="modo residente: atualiza cada série conforme a agenda de publicação "
+             "(incremental; ignora --stream e --processos)",
+    )
+    parser.add_argument(
+        "--publicar", action="store_true",
+        help="grava em raw/publicado/ os JSON minificados (+ .gz/.br) com hash no nome e manifest.json",
+    )
+    args = parser.parse_args()
+    if args.daemon:
+        servico = ServicoAtualizacao(
+            meses=args.meses, motor=args.motor,
+            usar_cache=not args.sem_cache, max_concorrencia=args.concorrencia,
+            prazo_serie=args.prazo, publicar=args.publicar, prometheus_path=args.prometheus,
+        )
+        parar = threading.Event()
+        signal.signal(signal.SIGINT, lambda *_: parar.set())
+        signal.signal(signal.SIGTERM, lambda *_: parar.set())
+        try:
+            executar_daemon(servico, parar)
+        finally:
+            servico.fechar()
+        sys.exit(0)
+    main(
+        incremental=args.incremental, max_concorrencia=args.concorrencia,
+        meses=args.meses, motor=args.motor,
+        usar_cache=not args.sem_cache, prometheus_path=args.prometheus,
+        stream=args.stream, processos=args.processos, publicar=args.publicar,
+        prazo_serie=args.prazo,
+    )
@@ -0,0 +1,86 @@
+"""SGS de mentira (http.server local) com respostas roteirizadas, para os testes de fetch."""
+
+import json
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CORPO = [{"data": "02/01/2024", "valor": "11,65"}, {"data": "03/01/2024", "valor": "11,65"}]
+
+
+class SgsFalso(ThreadingHTTPServer):
+    """
+    Responde na ordem de `respostas` ((status, corpo), (status, corpo,
+    cabeçalhos) ou ("lento", segundos)); a última se repete. Guarda os
+    cabeçalhos de cada pedido e o pico de pedidos atendidos ao mesmo tempo.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, respostas: list):
+        super().__init__(("127.0.0.1", 0), RespostaRoteirizada)
+        self.respostas = list(respostas)
+        self.pedidos = 0
+        self.cabecalhos = []  # cabeçalhos recebidos, um dict por pedido
+        self.em_voo = 0
+        self.pico = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url_base(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/dados/serie/bcdata.sgs.{{}}/dados"
+
+    def proxima(self, cabecalhos: dict) -> tuple:
+        with self._lock:
+            self.pedidos += 1
+            self.cabecalhos.append(cabecalhos)
+            self.em_voo += 1
+            self.pico = max(self.pico, self.em_voo)
+            resposta = self.respostas.pop(0) if len(self.respostas) > 1 else self.respostas[0]
+            return resposta if len(resposta) == 3 else (*resposta, {})
+
+    def concluida(self) -> None:
+        with self._lock:
+            self.em_voo -= 1
+
+
+class RespostaRoteirizada(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        status, corpo, extras = self.server.proxima(dict(self.headers))
+        try:
+            if status == "lento":
+                time.sleep(corpo)
+                status, corpo = 200, CORPO
+            conteudo = json.dumps(corpo).encode() if corpo is not None else b""
+        finally:
+            self.server.concluida()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(conteudo)))
+        for nome, valor in extras.items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+
+def iniciar_sgs_falso(teste: unittest.TestCase, respostas: list) -> SgsFalso:
+    """Sobe o SgsFalso numa thread; o teste o derruba no cleanup."""
+    servidor = SgsFalso(respostas)
+    threading.Thread(target=servidor.serve_forever, args=(0.05,), daemon=True).start()
+    teste.addCleanup(servidor.server_close)
+    teste.addCleanup(servidor.shutdown)
+    return servidor
+
+
+def porta_fechada() -> int:
+    """Porta local sem ninguém escutando (conexão recusada)."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
@@ -0,0 +1,35 @@
+"""Séries processadas sintéticas (formato de raw/<serie>.json) para os testes."""
+
+import json
+import random
+from datetime import date, timedelta
+
+
+def gerar_series(semente: int, dias: int, inicio: date = date(2015, 1, 2)) -> dict:
+    """
+    SELIC em degraus e USD/BRL em passeio aleatório nos dias úteis, IPCA no
+    dia 1 de cada mês. Inclui cotações repetidas e IPCA zero, que exercitam
+    retornos nulos e os empates de arredondamento.
+    """
+    aleatorio = random.Random(semente)
+    selic, usd, ipca = [], [], []
+    taxa, cotacao = 13.75, 5.0
+    for n in range(dias):
+        dia = inicio + timedelta(days=n)
+        data = dia.isoformat()
+        if dia.day == 1:
+            ipca.append({"data": data, "valor": aleatorio.choice([0.0, round(aleatorio.uniform(-0.4, 1.2), 2)])})
+        if dia.weekday() >= 5:
+            continue
+        if aleatorio.random() < 0.02:
+            taxa = max(2.0, taxa + aleatorio.choice([-0.5, -0.25, 0.25, 0.5]))
+        if aleatorio.random() > 0.1:
+            cotacao = round(cotacao * (1 + aleatorio.gauss(0, 0.01)), 4)
+        selic.append({"data": data, "valor": taxa})
+        usd.append({"data": data, "valor": cotacao})
+    return {"selic": selic, "usd_brl": usd, "ipca": ipca}
+
+
+def serializar(derivadas: dict) -> bytes:
+    """Mesmas opções do EscritorArtefatos.adicionar_json, para comparar byte a byte."""
+    return json.dumps(derivadas, ensure_ascii=False, indent=2).encode("utf-8")
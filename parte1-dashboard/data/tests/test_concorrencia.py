@@ -0,0 +1,58 @@
+"""
+Fetch concorrente: séries em paralelo (executar_por_serie), cada uma em
+blocos paralelos, todas pela mesma Session de criar_sessao(N). Nunca pode
+haver mais de N requisições ao SGS em voo.
+"""
+
+import unittest
+
+import fetch_bcb_data as bcb
+from tests.sgs_falso import CORPO, iniciar_sgs_falso
+
+NOMES = ["serie_a", "serie_b", "serie_c", "serie_d", "serie_e"]
+
+
+class TestConcorrencia(unittest.TestCase):
+
+    def setUp(self):
+        bcb.METRICAS.reiniciar()
+
+    def test_no_maximo_n_requisicoes_em_voo(self):
+        for limite in (1, 3):
+            servidor = iniciar_sgs_falso(self, [("lento", 0.02)])
+            sessao = bcb.criar_sessao(limite)
+            self.addCleanup(sessao.close)
+            blocos = len(bcb.dividir_janela("01/01/2020", "31/12/2020", 120))
+
+            def buscar(nome):
+                return bcb.fetch_serie_em_blocos(
+                    1000 + NOMES.index(nome), "01/01/2020", "31/12/2020", sessao, servidor.url_base,
+                    dias_por_bloco=120, max_concorrencia=limite,
+                )
+
+            with self.subTest(limite=limite):
+                resultados = bcb.executar_por_serie(buscar, NOMES, limite)
+
+                self.assertEqual(list(resultados), NOMES)
+                self.assertEqual(servidor.pedidos, len(NOMES) * blocos)
+                # o limite vale para o total, mesmo com pools de séries e de blocos aninhados
+                self.assertLessEqual(servidor.pico, limite)
+                self.assertEqual(servidor.pico, limite)
+
+    def test_busca_incremental_usa_url_base(self):
+        for stream in (False, True):
+            servidor = iniciar_sgs_falso(self, [(200, CORPO)])
+
+            with self.subTest(stream=stream):
+                recebidos, serie = bcb.buscar_incremental(
+                    "selic", 11, "01/01/2024", "05/01/2024", {}, salva=[], stream=stream,
+                    url_base=servidor.url_base,
+                )
+
+                self.assertEqual(recebidos, len(CORPO))
+                self.assertEqual(serie, bcb.processar_serie(CORPO))
+                self.assertEqual(servidor.pedidos, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+Recálculo incremental das séries derivadas (--incremental): refazer só a
+cauda a partir do series_derivadas.json anterior, com ou sem o estado de
+streaming do USD/BRL, tem de dar o mesmo JSON, byte a byte, que o
+recálculo completo sobre a janela nova.
+"""
+
+import unittest
+
+import fetch_bcb_data as bcb
+from tests.sinteticas import gerar_series, serializar
+
+MOTORES = ["python"] + (["numpy"] if bcb.np is not None else [])
+
+
+def janela(series: dict, inicio: str, fim: str) -> dict:
+    return {nome: [p for p in serie if inicio <= p["data"] <= fim] for nome, serie in series.items()}
+
+
+def recalcular_cauda(antigas: dict, novas: dict, motor: str, streaming: bool) -> tuple[dict, dict]:
+    """
+    Derivadas de `novas` pelo caminho incremental de atualizar_artefatos,
+    partindo do que a rodada sobre `antigas` deixou salvo. Devolve
+    (derivadas, cortes por cobertura).
+    """
+    salvas = bcb.CalculadoraDerivadas(antigas, motor).saida()
+    cobertura = bcb.cobertura_series(antigas)
+    estado = bcb.EstadoUsdStreaming.a_partir_da_serie(antigas["usd_brl"]) if streaming else None
+    ultima_usd = antigas["usd_brl"][-1]["data"]
+    recebidos = {"usd_brl": sum(1 for p in novas["usd_brl"] if p["data"] > ultima_usd)}
+
+    incremental = bcb.atualizar_derivadas_incremental(novas, recebidos, motor, salvas, cobertura, estado)
+    derivadas = incremental[0] if incremental else bcb.CalculadoraDerivadas(novas, motor).saida()
+    return derivadas, bcb.cortes_incrementais(cobertura, novas)
+
+
+class TestDerivadasIncrementais(unittest.TestCase):
+
+    def comparar(self, series: dict, anterior: tuple, nova: tuple, cortes_esperados: set) -> None:
+        antigas, novas = janela(series, *anterior), janela(series, *nova)
+        for motor in MOTORES:
+            completo = serializar(bcb.CalculadoraDerivadas(novas, motor).saida())
+            for streaming in (False, True):
+                with self.subTest(motor=motor, streaming=streaming, anterior=anterior, nova=nova):
+                    derivadas, cortes = recalcular_cauda(antigas, novas, motor, streaming)
+                    self.assertEqual(set(cortes), cortes_esperados)
+                    self.assertEqual(serializar(derivadas), completo)
+
+    def test_pontos_novos_no_fim(self):
+        series = gerar_series(1, dias=5 * 365)
+        self.comparar(series, ("2015-01-01", "2019-06-20"), ("2015-01-01", "2019-12-31"),
+                      {"selic", "usd_brl", "ipca"})
+
+    def test_janela_avanca(self):
+        # o início da janela anda junto com o fim, como numa rodada mensal
+        series = gerar_series(2, dias=5 * 365)
+        for inicio_novo, fim_novo in (("2015-02-01", "2019-07-31"), ("2016-03-15", "2019-12-31")):
+            self.comparar(series, ("2015-01-01", "2019-06-30"), (inicio_novo, fim_novo),
+                          {"selic", "usd_brl", "ipca"})
+
+    def test_sem_pontos_novos(self):
+        series = gerar_series(3, dias=3 * 365)
+        self.comparar(series, ("2015-01-01", "2017-06-30"), ("2015-01-01", "2017-06-30"),
+                      {"selic", "usd_brl", "ipca"})
+
+    def test_inicio_recuou_recalcula_inteira(self):
+        # janela maior para trás: as derivadas salvas não cobrem o começo
+        series = gerar_series(4, dias=4 * 365)
+        self.comparar(series, ("2016-01-01", "2018-06-30"), ("2015-06-01", "2018-09-30"), set())
+
+
+if __name__ == "__main__":
+    unittest.main()
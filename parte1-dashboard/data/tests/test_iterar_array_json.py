@@ -0,0 +1,114 @@
+"""
+iterar_array_json (--stream): o mesmo resultado do json.loads qualquer que
+seja o corte dos pedaços, e erro cedo para JSON truncado ou malformado.
+"""
+
+import json
+import random
+import unittest
+
+import fetch_bcb_data as bcb
+
+ELEMENTOS = [
+    {"data": "02/01/2024", "valor": "11,65"},
+    {"data": "03/01/2024", "valor": -0.25, "obs": "revisão ção € 😀"},
+    {"n": [0, -1, 12.5, 1e-07, -3.25E+10, 123456789012345678901234567890]},
+    {"escapes": "aspas \" barra \\ ç 😀 \n\t", "vazio": ""},
+    {"literais": [True, False, None], "aninhado": {"a": {"b": []}}},
+    12.75,
+    -0.0,
+    "texto solto",
+    None,
+]
+
+
+def pedacos_aleatorios(dados: bytes, aleatorio: random.Random, maximo: int = 8) -> list:
+    pedacos, i = [], 0
+    while i < len(dados):
+        n = aleatorio.randint(1, maximo)
+        pedacos.append(dados[i:i + n])
+        i += n
+    return pedacos
+
+
+def consumir(pedacos) -> list:
+    return list(bcb.iterar_array_json(pedacos))
+
+
+class TestIterarArrayJson(unittest.TestCase):
+
+    def test_cortes_aleatorios_iguais_ao_json_loads(self):
+        aleatorio = random.Random(0)
+        for texto in (
+            json.dumps(ELEMENTOS, ensure_ascii=False),
+            json.dumps(ELEMENTOS),  # escapes \uXXXX cortados no meio
+            json.dumps(ELEMENTOS, ensure_ascii=False, indent=2),
+        ):
+            dados = texto.encode("utf-8")
+            for _ in range(200):
+                pedacos = pedacos_aleatorios(dados, aleatorio)
+                self.assertEqual(consumir(pedacos), json.loads(texto))
+
+    def test_cada_byte_num_pedaco(self):
+        # caracteres de 2, 3 e 4 bytes em UTF-8 chegam divididos
+        dados = json.dumps(ELEMENTOS, ensure_ascii=False).encode("utf-8")
+        self.assertEqual(consumir([dados[i:i + 1] for i in range(len(dados))]), ELEMENTOS)
+
+    def test_numero_cortado(self):
+        for texto in ("[12.5]", "[-3.25E+10, 1e-07]", "[123456789012345678901234567890]"):
+            for corte in range(1, len(texto)):
+                with self.subTest(texto=texto, corte=corte):
+                    self.assertEqual(consumir([texto[:corte], texto[corte:]]), json.loads(texto))
+
+    def test_array_vazio(self):
+        for texto in ("[]", "  [ ]\n", "[\n]"):
+            for corte in range(len(texto) + 1):
+                with self.subTest(texto=texto, corte=corte):
+                    self.assertEqual(consumir([texto[:corte].encode(), texto[corte:].encode()]), [])
+
+    def test_sem_pedacos_ou_vazio(self):
+        with self.assertRaises(ValueError):
+            consumir([])
+        with self.assertRaises(ValueError):
+            consumir([b"", b"  "])
+
+    def test_truncado(self):
+        texto = json.dumps(ELEMENTOS, ensure_ascii=False)
+        dados = texto.encode("utf-8")
+        for corte in range(len(dados)):
+            with self.subTest(corte=corte):
+                with self.assertRaises(ValueError):
+                    consumir([dados[:corte]])
+
+    def test_lixo_depois_do_array(self):
+        for texto in ('[1, 2] x', '[1, 2]]', '[]{}', '[{"a": 1}] [2]'):
+            with self.subTest(texto=texto):
+                with self.assertRaises(ValueError):
+                    consumir([texto])
+
+    def test_malformado(self):
+        for texto in ('{"a": 1}', '[1 2]', '[{"a": 1x}]', '[{"a": 1} {"b": 2}]', '[tru]',
+                      '[{"a": "x\ny"}]', '[1,]', '[,1]', '[{"a" 1}]', '[1.}]'):
+            with self.subTest(texto=texto):
+                with self.assertRaises(ValueError):
+                    consumir([texto])
+
+    def test_malformado_falha_sem_ler_o_resto(self):
+        for inicio in ('[{"a": 1x}, ', '[{"a": 1} {"b": 2}, ', '[{"a": ]}, ', '[12 , 3 4, '):
+            lidos = []
+
+            def pedacos():
+                lidos.append(inicio)
+                yield inicio.encode()
+                for _ in range(10_000):
+                    lidos.append(None)
+                    yield b'{"data": "02/01/2024", "valor": "1,0"}, '
+
+            with self.subTest(inicio=inicio):
+                with self.assertRaises(ValueError):
+                    consumir(pedacos())
+                self.assertLessEqual(len(lidos), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""
+O motor numpy das séries derivadas (--motor numpy) tem de gerar o mesmo
+series_derivadas.json, byte a byte, que o motor python de referência.
+"""
+
+import unittest
+
+import fetch_bcb_data as bcb
+from tests.sinteticas import gerar_series, serializar
+
+
+@unittest.skipIf(bcb.np is None, "numpy não instalado")
+class TestMotorNumpy(unittest.TestCase):
+
+    def comparar(self, series: dict) -> None:
+        python = bcb.calcular_series_derivadas(series)
+        numpy = bcb.calcular_series_derivadas(series, motor="numpy")
+        self.assertEqual(serializar(numpy), serializar(python))
+
+    def test_igual_ao_motor_python(self):
+        for semente in range(5):
+            with self.subTest(semente=semente):
+                self.comparar(gerar_series(semente, dias=6 * 365))
+
+    def test_series_curtas(self):
+        # menos pontos que as janelas de 30 dias e 12 meses, e séries vazias
+        for dias in (0, 1, 20, 45, 400):
+            with self.subTest(dias=dias):
+                self.comparar(gerar_series(7, dias=dias))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+publicar_artefatos: cada versão publicada sobrevive até a publicação
+seguinte (quem carregou o manifesto anterior ainda a busca), as mais
+antigas são removidas, e um manifest.json ilegível não derruba a rodada.
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import fetch_bcb_data as bcb
+
+
+class TestPublicacao(unittest.TestCase):
+
+    def setUp(self):
+        temporario = tempfile.TemporaryDirectory()
+        self.addCleanup(temporario.cleanup)
+        self.origem = os.path.join(temporario.name, "raw")
+        self.destino = os.path.join(temporario.name, "publicado")
+        os.makedirs(os.path.join(self.origem, "resolucoes"))
+
+    def gerar(self, versao: int) -> None:
+        for relativo in ("kpis.json", os.path.join("resolucoes", "selic_mensal.json")):
+            with open(os.path.join(self.origem, relativo), "w", encoding="utf-8") as f:
+                json.dump({"versao": versao, "valores": [versao] * 3}, f, indent=2)
+
+    def publicar(self) -> dict:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return bcb.publicar_artefatos(self.origem, self.destino)
+
+    def publicados(self) -> set:
+        return {
+            os.path.relpath(os.path.join(raiz, nome), self.destino)
+            for raiz, _, nomes in os.walk(self.destino) for nome in nomes
+        }
+
+    def arquivos(self, artefatos: dict) -> set:
+        arquivos = set()
+        for entrada in artefatos.values():
+            arquivos.add(entrada["arquivo"])
+            for extensao in bcb._variantes_compactadas():
+                arquivos.add(entrada[extensao.lstrip(".")]["arquivo"])
+        return arquivos
+
+    def manifesto(self) -> dict:
+        with open(os.path.join(self.destino, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)["artefatos"]
+
+    def test_versao_anterior_sobrevive_a_uma_publicacao(self):
+        self.gerar(1)
+        primeira = self.publicar()
+        self.gerar(2)
+        segunda = self.publicar()
+
+        self.assertTrue(self.arquivos(primeira).isdisjoint(self.arquivos(segunda)))
+        self.assertEqual(self.publicados(), self.arquivos(primeira) | self.arquivos(segunda) | {"manifest.json"})
+        self.assertEqual(self.manifesto(), segunda)
+        with open(os.path.join(self.destino, segunda["kpis.json"]["arquivo"]), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["versao"], 2)
+
+        self.gerar(3)
+        terceira = self.publicar()
+
+        self.assertEqual(self.publicados(), self.arquivos(segunda) | self.arquivos(terceira) | {"manifest.json"})
+
+    def test_conteudo_igual_nao_regrava(self):
+        self.gerar(1)
+        primeira = self.publicar()
+        path = os.path.join(self.destino, primeira["kpis.json"]["arquivo"])
+        antes = os.stat(path).st_mtime_ns
+
+        self.assertEqual(self.publicar(), primeira)
+        self.assertEqual(os.stat(path).st_mtime_ns, antes)
+        self.assertEqual(self.publicados(), self.arquivos(primeira) | {"manifest.json"})
+
+    def test_manifesto_ilegivel_tratado_como_vazio(self):
+        for corrompido in ("{corrompido", '{"artefatos": []}', '{"outro": 1}', '{"artefatos": {"a": 1}}'):
+            with self.subTest(manifesto=corrompido):
+                self.gerar(1)
+                primeira = self.publicar()
+                self.gerar(2)
+                with open(os.path.join(self.destino, "manifest.json"), "w", encoding="utf-8") as f:
+                    f.write(corrompido)
+
+                segunda = self.publicar()
+
+                # sem saber o que ainda é servido, nenhuma versão é removida
+                self.assertEqual(self.manifesto(), segunda)
+                self.assertLessEqual(self.arquivos(primeira) | self.arquivos(segunda), self.publicados())
+
+
+if __name__ == "__main__":
+    unittest.main()
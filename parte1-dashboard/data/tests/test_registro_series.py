@@ -0,0 +1,66 @@
+"""
+Série nova = nova entrada em SERIES: as derivadas dela têm de aparecer em
+series_derivadas.json igual no caminho sequencial, no pool de processos
+(--processos) e no recálculo incremental.
+"""
+
+import unittest
+from unittest import mock
+
+import fetch_bcb_data as bcb
+from tests.sinteticas import gerar_series, serializar
+
+EUR_BRL = {
+    "codigo": 21619,
+    "descricao": "EUR/BRL - Câmbio Venda",
+    "frequencia": "diaria",
+    "agenda": "diaria",
+    "ttl_cache": 3600,
+    "derivadas": {"retornos_eur": "retornos", "eur_mensal_avg": "media_mensal"},
+}
+
+
+def com_eur(series: dict) -> dict:
+    eur = [{"data": p["data"], "valor": round(p["valor"] * 1.08, 4)} for p in series["usd_brl"]]
+    return {**series, "eur_brl": eur}
+
+
+def janela(series: dict, fim: str) -> dict:
+    return {nome: [p for p in serie if p["data"] <= fim] for nome, serie in series.items()}
+
+
+class TestRegistroSeries(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.dict(bcb.SERIES, {"eur_brl": EUR_BRL})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.series = com_eur(gerar_series(5, dias=3 * 365))
+
+    def test_sequencial_inclui_a_serie_nova(self):
+        derivadas = bcb.calcular_series_derivadas(self.series)
+
+        self.assertIn("retornos_eur", derivadas)
+        self.assertIn("eur_mensal_avg", derivadas)
+        self.assertEqual(len(derivadas["retornos_eur"]), len(self.series["eur_brl"]) - 1)
+
+    def test_processos_igual_ao_sequencial(self):
+        sequencial = bcb.calcular_series_derivadas(self.series)
+
+        _, paralelo = bcb.processar_series_paralelo(list(self.series), processados=self.series, max_processos=2)
+
+        self.assertEqual(serializar(paralelo), serializar(sequencial))
+
+    def test_incremental_igual_ao_sequencial(self):
+        antigas = janela(self.series, "2017-06-30")
+        salvas = bcb.calcular_series_derivadas(antigas)
+
+        derivadas, _ = bcb.atualizar_derivadas_incremental(
+            self.series, {}, "python", salvas, bcb.cobertura_series(antigas), None,
+        )
+
+        self.assertEqual(serializar(derivadas), serializar(bcb.calcular_series_derivadas(self.series)))
+
+
+if __name__ == "__main__":
+    unittest.main()
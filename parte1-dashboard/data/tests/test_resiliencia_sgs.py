@@ -0,0 +1,263 @@
+"""
+Retentativas, prazo, circuit breaker e o cache HTTP (TTL, revalidação com
+ETag, LRU, arquivos corrompidos) contra um SGS de mentira (http.server
+local). Rodar de parte1-dashboard/data:
+
+    python -m unittest discover tests      (ou: python -m pytest tests)
+"""
+
+import itertools
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import fetch_bcb_data as bcb
+from tests.sgs_falso import CORPO, SgsFalso, iniciar_sgs_falso, porta_fechada
+
+CORPO_NOVO = CORPO + [{"data": "04/01/2024", "valor": "11,65"}]
+JANELA = ("01/01/2024", "05/01/2024")
+
+
+class TestResilienciaSgs(unittest.TestCase):
+
+    def setUp(self):
+        bcb.METRICAS.reiniciar()
+        # backoff curto para o teste não dormir segundos entre tentativas
+        patcher = mock.patch.multiple(bcb, BACKOFF_BASE_S=0.01, BACKOFF_MAX_S=0.02)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def iniciar(self, respostas: list) -> SgsFalso:
+        return iniciar_sgs_falso(self, respostas)
+
+    def cache_temporario(self) -> bcb.CacheHttp:
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        return bcb.CacheHttp(diretorio.name)
+
+    def test_503_repetido_ate_responder(self):
+        servidor = self.iniciar([(503, None), (503, None), (200, CORPO)])
+
+        dados = bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=servidor.url_base)
+
+        self.assertEqual(dados, CORPO)
+        self.assertEqual(servidor.pedidos, 3)
+        metricas = bcb.METRICAS.etapas[("selic", "fetch")]
+        self.assertEqual(metricas["requisicoes"], 3)
+        self.assertEqual(metricas["retentativas"], 2)
+
+    def test_503_esgota_as_tentativas(self):
+        servidor = self.iniciar([(503, None)])
+
+        with self.assertRaises(bcb.SgsIndisponivel):
+            bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=servidor.url_base)
+        self.assertEqual(servidor.pedidos, bcb.MAX_TENTATIVAS)
+
+    def test_conexao_recusada_respeita_o_prazo(self):
+        url_base = f"http://127.0.0.1:{porta_fechada()}/dados/serie/bcdata.sgs.{{}}/dados"
+        inicio = time.monotonic()
+
+        with mock.patch.multiple(bcb, BACKOFF_BASE_S=5.0, BACKOFF_MAX_S=5.0):
+            with self.assertRaises(bcb.SgsIndisponivel):
+                bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=url_base, prazo=inicio + 0.5)
+        self.assertLess(time.monotonic() - inicio, 1.0)
+
+    def test_resposta_lenta_corta_no_prazo(self):
+        servidor = self.iniciar([("lento", 2.0)])
+        inicio = time.monotonic()
+
+        with self.assertRaises(bcb.SgsIndisponivel):
+            bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=servidor.url_base, prazo=inicio + 0.3)
+        self.assertLess(time.monotonic() - inicio, 1.5)
+
+    def test_404_vira_serie_vazia_fora_do_cache(self):
+        servidor = self.iniciar([(404, None)])
+        cache = self.cache_temporario()
+
+        for _ in range(2):
+            dados = bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=servidor.url_base, cache=cache)
+            self.assertEqual(dados, [])
+        # nada foi cacheado: a segunda consulta também chegou ao SGS
+        self.assertEqual(servidor.pedidos, 2)
+        self.assertIsNone(cache.obter(bcb.CacheHttp.chave(11, "01/01/2024", "05/01/2024")))
+
+    def test_circuito_abre_apos_falhas_seguidas(self):
+        servidor = self.iniciar([(503, None)])
+        disjuntor = bcb.DisjuntorSgs(limite_falhas=2, pausa=60)
+
+        with self.assertRaisesRegex(bcb.SgsIndisponivel, "circuito aberto"):
+            bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=servidor.url_base, disjuntor=disjuntor)
+        self.assertEqual(servidor.pedidos, 2)
+
+        # com o circuito aberto a série falha na hora, sem novo pedido
+        with self.assertRaisesRegex(bcb.SgsIndisponivel, "circuito aberto"):
+            bcb.fetch_serie(11, "06/01/2024", "10/01/2024", url_base=servidor.url_base, disjuntor=disjuntor)
+        self.assertEqual(servidor.pedidos, 2)
+        # o circuito é por série
+        self.assertTrue(disjuntor.permitir(1))
+
+    def test_circuito_fecha_depois_da_pausa(self):
+        servidor = self.iniciar([(503, None), (503, None), (200, CORPO)])
+        disjuntor = bcb.DisjuntorSgs(limite_falhas=2, pausa=0.05)
+
+        with self.assertRaises(bcb.SgsIndisponivel):
+            bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=servidor.url_base, disjuntor=disjuntor)
+        time.sleep(0.1)
+
+        dados = bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=servidor.url_base, disjuntor=disjuntor)
+        self.assertEqual(dados, CORPO)
+        self.assertTrue(disjuntor.permitir(11))
+
+    def test_cache_expirado_cobre_sgs_fora(self):
+        servidor = self.iniciar([(200, CORPO), (503, None)])
+        cache = self.cache_temporario()
+
+        # ttl 0: toda consulta volta ao SGS, o cache só serve de reserva
+        with mock.patch.dict(bcb.SERIES["selic"], {"ttl_cache": 0}):
+            primeira = bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=servidor.url_base, cache=cache)
+            segunda = bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=servidor.url_base, cache=cache)
+
+        self.assertEqual(primeira, CORPO)
+        self.assertEqual(segunda, CORPO)
+        self.assertEqual(servidor.pedidos, 1 + bcb.MAX_TENTATIVAS)
+        self.assertEqual(bcb.METRICAS.etapas[("selic", "fetch")]["cache_hits"], 1)
+
+    def test_sem_cache_sgs_fora_levanta(self):
+        url_base = f"http://127.0.0.1:{porta_fechada()}/dados/serie/bcdata.sgs.{{}}/dados"
+
+        with self.assertRaises(bcb.SgsIndisponivel):
+            bcb.fetch_serie(11, "01/01/2024", "05/01/2024", url_base=url_base, cache=self.cache_temporario())
+
+
+
+class TestCacheHttp(unittest.TestCase):
+
+    def setUp(self):
+        bcb.METRICAS.reiniciar()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+
+    def buscar(self, servidor: SgsFalso, cache: bcb.CacheHttp) -> list:
+        return bcb.fetch_serie(11, *JANELA, url_base=servidor.url_base, cache=cache)
+
+    def cache_hits(self) -> int:
+        return bcb.METRICAS.etapas[("selic", "fetch")]["cache_hits"]
+
+    def test_dentro_do_ttl_nao_consulta_o_sgs(self):
+        servidor = iniciar_sgs_falso(self, [(200, CORPO)])
+        cache = bcb.CacheHttp(self.diretorio)
+
+        self.assertEqual(self.buscar(servidor, cache), CORPO)
+        self.assertEqual(self.buscar(servidor, cache), CORPO)
+
+        self.assertEqual(servidor.pedidos, 1)
+        self.assertEqual(self.cache_hits(), 1)
+
+    def test_grava_sem_pool_de_threads(self):
+        servidor = iniciar_sgs_falso(self, [(200, CORPO)])
+        cache = bcb.CacheHttp(self.diretorio)
+
+        with mock.patch.object(bcb, "ThreadPoolExecutor", side_effect=AssertionError("pool para um arquivo")):
+            self.buscar(servidor, cache)
+
+        self.assertEqual(self.buscar(servidor, bcb.CacheHttp(self.diretorio)), CORPO)
+        self.assertEqual(servidor.pedidos, 1)
+
+    def test_ttl_vencido_revalida_com_etag_e_304(self):
+        servidor = iniciar_sgs_falso(self, [
+            (200, CORPO, {"ETag": '"v1"', "Last-Modified": "Tue, 02 Jan 2024 18:00:00 GMT"}),
+            (304, None, {"ETag": '"v1"'}),
+        ])
+        cache = bcb.CacheHttp(self.diretorio)
+
+        with mock.patch.dict(bcb.SERIES["selic"], {"ttl_cache": 0}):
+            self.buscar(servidor, cache)
+            dados = self.buscar(servidor, cache)
+
+        self.assertEqual(dados, CORPO)
+        self.assertEqual(servidor.pedidos, 2)
+        self.assertNotIn("If-None-Match", servidor.cabecalhos[0])
+        self.assertEqual(servidor.cabecalhos[1]["If-None-Match"], '"v1"')
+        self.assertEqual(servidor.cabecalhos[1]["If-Modified-Since"], "Tue, 02 Jan 2024 18:00:00 GMT")
+        self.assertEqual(self.cache_hits(), 1)
+
+    def test_etag_mudou_substitui_a_entrada(self):
+        servidor = iniciar_sgs_falso(self, [
+            (200, CORPO, {"ETag": '"v1"'}), (200, CORPO_NOVO, {"ETag": '"v2"'}), (304, None),
+        ])
+        cache = bcb.CacheHttp(self.diretorio)
+
+        with mock.patch.dict(bcb.SERIES["selic"], {"ttl_cache": 0}):
+            resultados = [self.buscar(servidor, cache) for _ in range(3)]
+
+        self.assertEqual(resultados, [CORPO, CORPO_NOVO, CORPO_NOVO])
+        self.assertEqual([c.get("If-None-Match") for c in servidor.cabecalhos], [None, '"v1"', '"v2"'])
+
+    def test_lru_descarta_a_entrada_menos_usada(self):
+        relogio = itertools.count(1_000_000.0)
+        with mock.patch.object(bcb.time, "time", lambda: next(relogio)):
+            cache = bcb.CacheHttp(self.diretorio)
+            for chave in "abc":
+                cache.gravar(chave, CORPO)
+            tamanho = os.path.getsize(os.path.join(self.diretorio, "a.json"))
+            cache.max_bytes = 3 * tamanho
+            self.assertIsNotNone(cache.obter("a"))  # "a" passa a ser a mais recente
+            cache.gravar("d", CORPO)
+
+        self.assertIsNone(cache.obter("b"))
+        self.assertFalse(os.path.exists(os.path.join(self.diretorio, "b.json")))
+        for chave in "acd":
+            self.assertIsNotNone(cache.obter(chave))
+        # o índice gravado reflete o descarte
+        self.assertEqual(sorted(bcb.CacheHttp(self.diretorio)._indice), ["a", "c", "d"])
+
+    def test_leitura_nao_regrava_o_indice(self):
+        cache = bcb.CacheHttp(self.diretorio)
+        cache.gravar("a", CORPO)
+        indice = os.path.join(self.diretorio, "_indice.json")
+        antes = os.stat(indice)
+
+        for _ in range(3):
+            self.assertIsNotNone(cache.obter("a"))
+
+        depois = os.stat(indice)
+        self.assertEqual((antes.st_ino, antes.st_mtime_ns), (depois.st_ino, depois.st_mtime_ns))
+
+    def test_entrada_corrompida_vale_como_ausente(self):
+        servidor = iniciar_sgs_falso(self, [(200, CORPO)])
+        cache = bcb.CacheHttp(self.diretorio)
+        self.buscar(servidor, cache)
+        chave = bcb.CacheHttp.chave(11, *JANELA)
+        path = os.path.join(self.diretorio, f"{chave}.json")
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) // 2)
+
+        self.assertEqual(self.buscar(servidor, cache), CORPO)
+
+        self.assertEqual(servidor.pedidos, 2)
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["corpo"], CORPO)
+
+    def test_indice_corrompido_e_reconstruido(self):
+        cache = bcb.CacheHttp(self.diretorio)
+        for chave in "ab":
+            cache.gravar(chave, CORPO)
+        indice = os.path.join(self.diretorio, "_indice.json")
+        with open(indice, "w", encoding="utf-8") as f:
+            f.write('{"a": {"bytes": 1')
+
+        reaberto = bcb.CacheHttp(self.diretorio)
+
+        for chave in "ab":
+            self.assertEqual(reaberto.obter(chave)["corpo"], CORPO)
+        with open(indice, encoding="utf-8") as f:
+            self.assertEqual(sorted(json.load(f)), ["a", "b"])
+        self.assertEqual([n for n in os.listdir(self.diretorio) if not n.endswith(".json")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
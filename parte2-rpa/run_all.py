@@ -4,9 +4,12 @@
 # 2. Check Box - Seleção de itens
 # 3. Web Tables - Extração e resumo
 # 4. Upload - Upload de arquivo com validação
-# Execução: python run_all.py
+# Execução: python run_all.py [--perfil demo|rapido] [--preenchimento fill|digitar|humano]
+#           [--todas-paginas] [--concorrencia N]
 
+import argparse
 import asyncio
+import contextvars
 import json
 import csv
 import os
@@ -16,11 +19,25 @@ import random
 from datetime import datetime
 from pathlib import Path
 
+# nome do cenario que esta rodando na task atual (vazio fora dos cenarios)
+# cada task do gather tem sua copia, entao cenarios em paralelo nao se misturam
+CENARIO_ATUAL = contextvars.ContextVar("cenario_atual", default="")
+
+
+class FiltroCenario(logging.Filter):
+    # poe o nome do cenario no comeco de cada linha de log
+    # pega tambem os logs das funcoes auxiliares chamadas pelo cenario
+    def filter(self, registro):
+        nome = CENARIO_ATUAL.get()
+        registro.cenario = f"[{nome}] " if nome else ""
+        return True
+
+
 # configuracao dos logs
 # define o nivel minimo de log e como vai aparecer
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
+    format="%(asctime)s [%(levelname)s] %(cenario)s%(message)s",
     handlers=[
         # salva os logs num arquivo
         logging.FileHandler("outputs/execution.log", mode="w", encoding="utf-8"),
@@ -28,6 +45,8 @@ logging.basicConfig(
         logging.StreamHandler(sys.stdout),
     ],
 )
+for handler in logging.getLogger().handlers:
+    handler.addFilter(FiltroCenario())
 
 # cria o logger pra usar no codigo
 logger = logging.getLogger(__name__)
@@ -59,15 +78,50 @@ PESSOA = {
 }
 
 
-async def configurar_navegador(playwright, mostrar_interface=True):
-    # prepara o navegador chrome e retorna os objetos
+# quantos cenarios rodam ao mesmo tempo (cada um no seu contexto)
+CONCORRENCIA_PADRAO = 4
+
+# como os campos de texto sao preenchidos
+# fill: seta o valor numa operacao so
+# digitar: digita tudo de uma vez, sem delay (dispara os eventos de tecla)
+# humano: caractere por caractere com delay aleatorio
+ESTRATEGIAS_PREENCHIMENTO = ("fill", "digitar", "humano")
+
+# perfis de execucao
+# demo: ritmo de gente (pausas pra video), tenta abrir com interface e grava video
+# rapido: sem pausas, headless, so espera seletor/resultado aparecer (bom pra ci)
+PERFIS = {
+    "demo": {"pausas": True, "headless": False, "carregamento": "load", "preenchimento": "humano",
+             "todas_paginas": False},
+    "rapido": {"pausas": False, "headless": True, "carregamento": "domcontentloaded", "preenchimento": "fill",
+               "todas_paginas": False},
+}
+PERFIL_PADRAO = "demo"
+
+
+async def pausar(pagina, perfil, milissegundos):
+    # pausa so de ritmo (pra video); no perfil rapido nao espera nada
+    if perfil["pausas"]:
+        await pagina.wait_for_timeout(milissegundos)
+
+
+async def navegar(pagina, perfil, url, seletor):
+    # abre a url e espera o elemento principal da pagina ficar visivel
+    # no rapido nao espera o load inteiro (anuncios etc), so o dom e o seletor
+    await pagina.goto(url, wait_until=perfil["carregamento"])
+    await pagina.wait_for_selector(seletor, state="visible", timeout=10000)
+
+
+async def iniciar_navegador(playwright, mostrar_interface=True):
     # inicia o chrome com ou sem interface visual
-    navegador = await playwright.chromium.launch(
+    return await playwright.chromium.launch(
         headless=not mostrar_interface,
         args=["--no-sandbox", "--disable-setuid-sandbox"],
     )
-    
-    # cria um contexto do navegador com as configs de tela
+
+
+async def abrir_contexto(navegador, mostrar_interface=True):
+    # cria um contexto isolado (cookies, storage e video proprios) com uma aba
     contexto = await navegador.new_context(
         viewport={"width": 1280, "height": 720},
         # grava video so se tiver em modo visual
@@ -81,7 +135,7 @@ async def configurar_navegador(playwright, mostrar_interface=True):
     # define tempo maximo de espera pra operacoes (15 segundos)
     pagina.set_default_timeout(15000)
     
-    return navegador, contexto, pagina
+    return contexto, pagina
 
 
 async def clicar_com_seguranca(pagina, seletor, descricao="elemento", tentativas=3):
@@ -106,10 +160,7 @@ async def clicar_com_seguranca(pagina, seletor, descricao="elemento", tentativas
                 raise
 
 
-async def preencher_campo(pagina, seletor, valor, descricao="campo"):
-    # espera o campo aparecer na tela
-    await pagina.wait_for_selector(seletor, state="visible", timeout=5000)
-    
+async def digitar_como_humano(pagina, seletor, valor):
     # clica no campo primeiro
     await pagina.click(seletor)
     await pagina.wait_for_timeout(500)
@@ -128,44 +179,73 @@ async def preencher_campo(pagina, seletor, valor, descricao="campo"):
     
     # pequeno delay final
     await pagina.wait_for_timeout(random.randint(300, 600))
+
+
+async def preencher_campo(pagina, seletor, valor, descricao="campo", perfil=PERFIS[PERFIL_PADRAO]):
+    # espera o campo aparecer na tela
+    await pagina.wait_for_selector(seletor, state="visible", timeout=5000)
     
-    logger.info(f"  ✓ Preencheu {descricao}: {valor[:50]}...")
+    estrategia = perfil["preenchimento"]
+    if estrategia == "fill":
+        # limpa e seta o valor de uma vez
+        await pagina.fill(seletor, valor)
+    elif estrategia == "digitar":
+        # limpa e digita tudo numa chamada so, sem delay entre teclas
+        await pagina.fill(seletor, "")
+        await pagina.locator(seletor).press_sequentially(valor)
+    else:
+        await digitar_como_humano(pagina, seletor, valor)
+    
+    # le o valor de volta pra confirmar que o campo ficou certo
+    valor_lido = await pagina.input_value(seletor)
+    if valor_lido != valor:
+        # se nao bateu (mascara, evento perdido etc), tenta setar direto
+        logger.warning(f"  ⚠ {descricao} ficou com {valor_lido[:50]!r}, refazendo com fill")
+        await pagina.fill(seletor, valor)
+        valor_lido = await pagina.input_value(seletor)
+        if valor_lido != valor:
+            raise ValueError(f"{descricao}: esperado {valor!r}, campo tem {valor_lido!r}")
+    
+    logger.info(f"  ✓ Preencheu {descricao} ({estrategia}): {valor[:50]}...")
 
 
 # cenario 1: text box
-async def cenario_caixa_texto(pagina):
+async def cenario_caixa_texto(pagina, perfil=PERFIS[PERFIL_PADRAO]):
     # preenche o formulario de text box e extrai o resultado que aparece
     logger.info("=" * 60)
     logger.info("CENÁRIO 1: TEXT BOX")
     logger.info("=" * 60)
 
     # navega pra pagina do formulario
-    await pagina.goto(URLS["text_box"])
-    await pagina.wait_for_load_state("load")
     # espera o campo principal aparecer pra garantir que a pagina carregou
-    await pagina.wait_for_selector("#userName", state="visible", timeout=10000)
+    await navegar(pagina, perfil, URLS["text_box"], "#userName")
     logger.info(f"  Navegou para: {URLS['text_box']}")
-    await pagina.wait_for_timeout(3000)  # delay pra video
+    await pausar(pagina, perfil, 3000)  # delay pra video
 
     # preenche todos os campos do formulario
-    await preencher_campo(pagina, "#userName", PESSOA["full_name"], "Nome Completo")
-    await pagina.wait_for_timeout(3000)  # delay entre campos pra video
-    await preencher_campo(pagina, "#userEmail", PESSOA["email"], "Email")
-    await pagina.wait_for_timeout(3000)
-    await preencher_campo(pagina, "#currentAddress", PESSOA["current_address"], "Endereço Atual")
-    await pagina.wait_for_timeout(3000)
-    await preencher_campo(pagina, "#permanentAddress", PESSOA["permanent_address"], "Endereço Permanente")
-    await pagina.wait_for_timeout(3000)
+    await preencher_campo(pagina, "#userName", PESSOA["full_name"], "Nome Completo", perfil)
+    await pausar(pagina, perfil, 3000)  # delay entre campos pra video
+    await preencher_campo(pagina, "#userEmail", PESSOA["email"], "Email", perfil)
+    await pausar(pagina, perfil, 3000)
+    await preencher_campo(pagina, "#currentAddress", PESSOA["current_address"], "Endereço Atual", perfil)
+    await pausar(pagina, perfil, 3000)
+    await preencher_campo(pagina, "#permanentAddress", PESSOA["permanent_address"], "Endereço Permanente", perfil)
+    await pausar(pagina, perfil, 3000)
 
     # rola a pagina pra baixo pra o botao ficar visivel
     await pagina.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-    await pagina.wait_for_timeout(2000)
+    await pausar(pagina, perfil, 2000)
 
     # clica no botao de enviar
     await clicar_com_seguranca(pagina, "#submit", "Botão Enviar")
-    await pagina.wait_for_timeout(4000)  # delay pra ver o resultado aparecer
+    await pausar(pagina, perfil, 4000)  # delay pra ver o resultado aparecer
 
     # extrai o resultado que aparece na tela depois de enviar
+    # espera o resultado renderizar (se nao aparecer, o cenario sai como falha abaixo)
+    try:
+        await pagina.wait_for_selector("#output #name", state="visible", timeout=5000)
+    except Exception:
+        pass
     div_resultado = await pagina.query_selector("#output")
     resultado = {}
     if div_resultado:
@@ -202,25 +282,24 @@ async def cenario_caixa_texto(pagina):
 
 
 # cenario 2: check box
-async def cenario_checkbox(pagina):
+async def cenario_checkbox(pagina, perfil=PERFIS[PERFIL_PADRAO]):
     # expande a arvore de checkboxes e seleciona commands e general
     logger.info("=" * 60)
     logger.info("CENÁRIO 2: CHECK BOX")
     logger.info("=" * 60)
 
     # navega pra pagina de checkboxes
-    await pagina.goto(URLS["check_box"])
-    await pagina.wait_for_load_state("load")
     # espera a arvore de checkboxes aparecer
-    await pagina.wait_for_selector(".rct-icon", state="visible", timeout=10000)
+    await navegar(pagina, perfil, URLS["check_box"], ".rct-icon")
     logger.info(f"  Navegou para: {URLS['check_box']}")
-    await pagina.wait_for_timeout(3000)  # delay pra video
+    await pausar(pagina, perfil, 3000)  # delay pra video
 
     # tenta expandir toda a arvore clicando no botao expand all
     botao_expandir = await pagina.query_selector("button[title='Expand all']")
     if botao_expandir:
         await botao_expandir.click()
-        await pagina.wait_for_timeout(4000)  # delay pra ver a arvore expandir
+        await pausar(pagina, perfil, 4000)  # delay pra ver a arvore expandir
+        await pagina.wait_for_selector("label[for='tree-node-commands']", state="visible", timeout=5000)
         logger.info("  ✓ Árvore expandida")
     else:
         # se nao encontrar o botao, expande manualmente cada item
@@ -228,7 +307,7 @@ async def cenario_checkbox(pagina):
         for botao_toggle in botoes_toggle:
             try:
                 await botao_toggle.click()
-                await pagina.wait_for_timeout(200)
+                await pausar(pagina, perfil, 200)
             except:
                 pass
         logger.info("  ✓ Árvore expandida manualmente")
@@ -240,12 +319,12 @@ async def cenario_checkbox(pagina):
         label_commands = await pagina.query_selector("//span[contains(text(),'Commands')]/..")
     if label_commands:
         await label_commands.click()
-        await pagina.wait_for_timeout(3000)  # delay pra ver a selecao
+        await pausar(pagina, perfil, 3000)  # delay pra ver a selecao
         logger.info("  ✓ Selecionado: Commands")
     else:
         # alternativa: clicar no label pelo texto
         await pagina.click("text=Commands")
-        await pagina.wait_for_timeout(3000)
+        await pausar(pagina, perfil, 3000)
         logger.info("  ✓ Selecionado: Commands (via texto)")
 
     # seleciona o checkbox general
@@ -255,16 +334,20 @@ async def cenario_checkbox(pagina):
         label_general = await pagina.query_selector("//span[contains(text(),'General')]/..")
     if label_general:
         await label_general.click()
-        await pagina.wait_for_timeout(3000)  # delay pra ver a selecao
+        await pausar(pagina, perfil, 3000)  # delay pra ver a selecao
         logger.info("  ✓ Selecionado: General")
     else:
         # alternativa: clicar no label pelo texto
         await pagina.click("text=General")
-        await pagina.wait_for_timeout(3000)
+        await pausar(pagina, perfil, 3000)
         logger.info("  ✓ Selecionado: General (via texto)")
 
     # verifica o texto de resultado que aparece na tela
-    await pagina.wait_for_timeout(2000)  # delay antes de verificar resultado
+    await pausar(pagina, perfil, 2000)  # delay antes de verificar resultado
+    try:
+        await pagina.wait_for_selector("#result >> text=general", state="visible", timeout=5000)
+    except Exception:
+        logger.warning("  ⚠ Resultado da seleção não apareceu")
     elemento_resultado = await pagina.query_selector("#result")
     texto_selecionado = ""
     if elemento_resultado:
@@ -272,7 +355,7 @@ async def cenario_checkbox(pagina):
         logger.info(f"  ✓ Resultado: {texto_selecionado}")
 
     # tira screenshot como evidencia do que foi selecionado
-    await pagina.wait_for_timeout(2000)  # delay antes do screenshot
+    await pausar(pagina, perfil, 2000)  # delay antes do screenshot
     await pagina.screenshot(path=str(DIRETORIO_SAIDAS / "checkbox_evidence.png"), full_page=True)
     logger.info("  ✓ Screenshot salvo")
 
@@ -293,81 +376,146 @@ async def cenario_checkbox(pagina):
     return dados_saida
 
 
+# colunas da web table, na ordem em que aparecem
+COLUNAS_TABELA = ["First Name", "Last Name", "Age", "Email", "Salary", "Department"]
+
+# le o texto de todas as celulas dentro do navegador e devolve uma lista de linhas
+# (uma ida e volta so, em vez de uma chamada por celula)
+SCRIPT_EXTRAIR_TABELA = """
+(colunas) => Array.from(
+    document.querySelectorAll(".rt-tr-group"),
+    (linha) => Array.from(linha.querySelectorAll(".rt-td"), (celula) => celula.innerText.trim()).slice(0, colunas)
+)
+"""
+
+
+# numero da pagina atual da tabela (null se a tabela nao tiver paginacao)
+SCRIPT_PAGINA_TABELA = """
+() => document.querySelector(".-pageJump input")?.value ?? null
+"""
+
+# quantos registros vao inteiros pro webtables_summary.json (o csv tem todos)
+LIMITE_REGISTROS_RESUMO = 100
+
+
+async def extrair_linhas_tabela(pagina):
+    # extrai as linhas visiveis da tabela como lista de dicts
+    linhas = await pagina.evaluate(SCRIPT_EXTRAIR_TABELA, len(COLUNAS_TABELA))
+    registros = []
+    for valores in linhas:
+        # ignora linhas vazias (celulas com espaco em branco ou caracteres especiais)
+        if len(valores) >= len(COLUNAS_TABELA) and valores[0] and valores[0] not in ("\xa0", " "):
+            registros.append(dict(zip(COLUNAS_TABELA, valores)))
+    return registros
+
+
+async def maximizar_linhas_por_pagina(pagina):
+    # escolhe a maior opcao de "rows per page" pra precisar de menos paginas
+    seletor = "select[aria-label='rows per page']"
+    if not await pagina.query_selector(seletor):
+        return
+    opcoes = await pagina.eval_on_selector_all(f"{seletor} option", "(opcoes) => opcoes.map((o) => o.value)")
+    maior = max(opcoes, key=int)
+    await pagina.select_option(seletor, maior)
+    logger.info(f"  ✓ Linhas por página: {maior}")
+
+
+async def avancar_pagina_tabela(pagina):
+    # vai pra proxima pagina da tabela; devolve False se ja tava na ultima
+    botao_proxima = await pagina.query_selector(".-next button:not([disabled])")
+    pagina_atual = await pagina.evaluate(SCRIPT_PAGINA_TABELA)
+    if not botao_proxima or pagina_atual is None:
+        return False
+    await botao_proxima.click()
+    # espera o numero da pagina mudar (a tabela re-renderiza junto)
+    await pagina.wait_for_function(
+        "(anterior) => document.querySelector('.-pageJump input')?.value !== anterior",
+        arg=pagina_atual, timeout=5000,
+    )
+    return True
+
+
+def acumular_estatisticas(estatisticas, registro):
+    # atualiza contagem, soma de salarios e contagem por departamento sem guardar os registros
+    estatisticas["total_registros"] += 1
+    try:
+        # tenta converter salario pra numero
+        estatisticas["soma_salary"] += int(registro["Salary"])
+        estatisticas["registros_com_salary"] += 1
+    except (ValueError, TypeError):
+        # se nao conseguir converter, ignora
+        pass
+    departamento = registro["Department"]
+    contagem = estatisticas["registros_por_department"]
+    contagem[departamento] = contagem.get(departamento, 0) + 1
+
+
 # cenario 3: web tables
-async def cenario_tabelas_web(pagina):
+async def cenario_tabelas_web(pagina, perfil=PERFIS[PERFIL_PADRAO]):
     # extrai todos os dados da tabela e gera csv e json com resumo
     logger.info("=" * 60)
     logger.info("CENÁRIO 3: WEB TABLES")
     logger.info("=" * 60)
 
     # navega pra pagina de tabelas
-    await pagina.goto(URLS["web_tables"])
-    await pagina.wait_for_load_state("load")
     # espera a tabela aparecer
-    await pagina.wait_for_selector(".rt-tr-group", state="visible", timeout=10000)
+    await navegar(pagina, perfil, URLS["web_tables"], ".rt-tr-group")
     logger.info(f"  Navegou para: {URLS['web_tables']}")
-    await pagina.wait_for_timeout(3000)  # delay pra video
+    await pausar(pagina, perfil, 3000)  # delay pra video
 
-    # encontra todas as linhas da tabela
-    linhas = await pagina.query_selector_all(".rt-tr-group")
-    registros = []
+    # com todas_paginas, aumenta as linhas por pagina e percorre a paginacao toda
+    if perfil["todas_paginas"]:
+        await maximizar_linhas_por_pagina(pagina)
 
-    # pra cada linha, extrai os dados das celulas
-    for linha in linhas:
-        celulas = await linha.query_selector_all(".rt-td")
-        if len(celulas) >= 6:
-            valores = []
-            for celula in celulas[:6]:
-                texto = (await celula.inner_text()).strip()
-                valores.append(texto)
-
-            # ignora linhas vazias (celulas com espaco em branco ou caracteres especiais)
-            if valores[0] and valores[0] != "\xa0" and valores[0] != " ":
-                registros.append({
-                    "First Name": valores[0],
-                    "Last Name": valores[1],
-                    "Age": valores[2],
-                    "Email": valores[3],
-                    "Salary": valores[4],
-                    "Department": valores[5],
-                })
-
-    logger.info(f"  ✓ Extraídos {len(registros)} registros")
-    await pagina.wait_for_timeout(2000)  # delay pra ver os dados extraidos
-
-    # salva todos os registros num arquivo csv
+    # vai gravando cada pagina no csv e nas estatisticas assim que extrai
+    # (so a pagina atual fica em memoria, mais os primeiros registros pro resumo)
     caminho_csv = DIRETORIO_SAIDAS / "webtables_extract.csv"
-    if registros:
-        nomes_colunas = ["First Name", "Last Name", "Age", "Email", "Salary", "Department"]
-        with open(caminho_csv, "w", newline="", encoding="utf-8") as arquivo:
-            escritor = csv.DictWriter(arquivo, fieldnames=nomes_colunas)
-            escritor.writeheader()
+    estatisticas = {
+        "total_registros": 0,
+        "soma_salary": 0,
+        "registros_com_salary": 0,
+        "registros_por_department": {},
+    }
+    amostra = []
+    paginas_lidas = 0
+    with open(caminho_csv, "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=COLUNAS_TABELA)
+        escritor.writeheader()
+        while True:
+            # extrai todas as linhas da pagina de uma vez
+            registros = await extrair_linhas_tabela(pagina)
+            paginas_lidas += 1
             escritor.writerows(registros)
-        logger.info(f"  ✓ CSV salvo: {caminho_csv}")
+            for registro in registros:
+                acumular_estatisticas(estatisticas, registro)
+            amostra.extend(registros[:LIMITE_REGISTROS_RESUMO - len(amostra)])
 
-    # calcula estatisticas dos dados extraidos
-    salarios = []
-    contagem_departamentos = {}
-    for registro in registros:
-        try:
-            # tenta converter salario pra numero
-            salario = int(registro["Salary"])
-            salarios.append(salario)
-        except (ValueError, TypeError):
-            # se nao conseguir converter, ignora
-            pass
-        departamento = registro["Department"]
-        contagem_departamentos[departamento] = contagem_departamentos.get(departamento, 0) + 1
+            if not perfil["todas_paginas"] or not await avancar_pagina_tabela(pagina):
+                break
+            await pausar(pagina, perfil, 1000)  # delay entre paginas pra video
+
+    total_registros = estatisticas["total_registros"]
+    logger.info(f"  ✓ Extraídos {total_registros} registros ({paginas_lidas} página(s))")
+    await pausar(pagina, perfil, 2000)  # delay pra ver os dados extraidos
+
+    # sem registro nenhum nao deixa csv so com cabecalho
+    if total_registros:
+        logger.info(f"  ✓ CSV salvo: {caminho_csv}")
+    else:
+        caminho_csv.unlink()
 
     # cria resumo com estatisticas
     resumo = {
         "cenario": "web_tables",
         "timestamp": datetime.now().isoformat(),
-        "total_registros": len(registros),
-        "media_salary": round(sum(salarios) / len(salarios), 2) if salarios else 0,
-        "registros_por_department": contagem_departamentos,
-        "dados_extraidos": registros,
-        "status": "sucesso" if registros else "falha",
+        "total_registros": total_registros,
+        "paginas_lidas": paginas_lidas,
+        "media_salary": round(estatisticas["soma_salary"] / estatisticas["registros_com_salary"], 2)
+        if estatisticas["registros_com_salary"] else 0,
+        "registros_por_department": estatisticas["registros_por_department"],
+        # ate LIMITE_REGISTROS_RESUMO registros; a extracao completa fica no csv
+        "dados_extraidos": amostra,
+        "status": "sucesso" if total_registros else "falha",
     }
 
     # salva resumo num arquivo json
@@ -384,19 +532,17 @@ async def cenario_tabelas_web(pagina):
 
 
 # cenario 4: upload
-async def cenario_upload(pagina):
+async def cenario_upload(pagina, perfil=PERFIS[PERFIL_PADRAO]):
     # faz upload de arquivo pdf e valida se apareceu certo na interface
     logger.info("=" * 60)
     logger.info("CENÁRIO 4: UPLOAD AND DOWNLOAD")
     logger.info("=" * 60)
 
     # navega pra pagina de upload
-    await pagina.goto(URLS["upload_download"])
-    await pagina.wait_for_load_state("load")
     # espera o input de upload aparecer
-    await pagina.wait_for_selector("#uploadFile", state="visible", timeout=10000)
+    await navegar(pagina, perfil, URLS["upload_download"], "#uploadFile")
     logger.info(f"  Navegou para: {URLS['upload_download']}")
-    await pagina.wait_for_timeout(3000)  # delay pra video
+    await pausar(pagina, perfil, 3000)  # delay pra video
 
     # verifica se o arquivo de teste existe, se nao existir, cria um
     arquivo_teste = DIRETORIO_ASSETS / "documento_teste.pdf"
@@ -410,13 +556,18 @@ async def cenario_upload(pagina):
     input_arquivo = await pagina.query_selector("#uploadFile")
     if input_arquivo:
         await input_arquivo.set_input_files(str(arquivo_teste))
-        await pagina.wait_for_timeout(4000)  # delay pra ver o upload acontecer
+        await pausar(pagina, perfil, 4000)  # delay pra ver o upload acontecer
         logger.info(f"  ✓ Upload realizado: {arquivo_teste.name}")
     else:
         logger.error("  ✗ Input de upload não encontrado")
 
     # verifica se o nome do arquivo aparece na interface depois do upload
-    await pagina.wait_for_timeout(2000)  # delay antes de verificar
+    await pausar(pagina, perfil, 2000)  # delay antes de verificar
+    # espera a confirmacao do upload (se nao aparecer, o cenario sai como falha abaixo)
+    try:
+        await pagina.wait_for_selector("#uploadedFilePath", state="visible", timeout=5000)
+    except Exception:
+        pass
     elemento_caminho_upload = await pagina.query_selector("#uploadedFilePath")
     nome_arquivo_confirmado = ""
     if elemento_caminho_upload:
@@ -424,11 +575,11 @@ async def cenario_upload(pagina):
         logger.info(f"  ✓ Arquivo confirmado na UI: {nome_arquivo_confirmado}")
 
     # tira screenshot como evidencia do upload
-    await pagina.wait_for_timeout(2000)  # delay antes do screenshot
+    await pausar(pagina, perfil, 2000)  # delay antes do screenshot
     await pagina.screenshot(path=str(DIRETORIO_SAIDAS / "upload_evidence.png"), full_page=True)
 
     # faz o download do arquivo (bonus)
-    await pagina.wait_for_timeout(2000)  # delay antes do download
+    await pausar(pagina, perfil, 2000)  # delay antes do download
     nome_arquivo_baixado = ""
     caminho_arquivo_baixado = ""
     
@@ -446,7 +597,7 @@ async def cenario_upload(pagina):
             await download.save_as(caminho_arquivo_baixado)
             nome_arquivo_baixado = download.suggested_filename
             logger.info(f"  ✓ Download realizado: {nome_arquivo_baixado}")
-            await pagina.wait_for_timeout(2000)  # delay depois do download
+            await pausar(pagina, perfil, 2000)  # delay depois do download
         else:
             logger.warning("  ⚠ Botão de download não encontrado")
     except Exception as erro:
@@ -533,12 +684,53 @@ startxref
         logger.info(f"  ✓ PDF criado (minimal): {caminho}")
 
 
+# cenarios na ordem do relatorio
+# cada um recebe so a pagina e nao depende dos outros
+CENARIOS = {
+    "text_box": cenario_caixa_texto,
+    "check_box": cenario_checkbox,
+    "web_tables": cenario_tabelas_web,
+    "upload": cenario_upload,
+}
+
+
+async def executar_cenario(navegador, nome, cenario, semaforo, mostrar_interface, perfil):
+    # roda um cenario no seu proprio contexto
+    # se der erro, vira um resultado de falha e nao derruba os outros
+    CENARIO_ATUAL.set(nome)
+    async with semaforo:
+        contexto, pagina = await abrir_contexto(navegador, mostrar_interface)
+        try:
+            resultado = await cenario(pagina, perfil)
+            await pausar(pagina, perfil, 3000)  # delay final pra video
+            return resultado
+        except Exception as erro:
+            logger.error(f"  ✗ Cenário {nome} falhou: {erro}")
+            return {
+                "cenario": nome,
+                "timestamp": datetime.now().isoformat(),
+                "erro": str(erro),
+                "status": "falha",
+            }
+        finally:
+            # fechar o contexto eh o que finaliza o video desse cenario
+            await contexto.close()
+
+
 # funcao principal
-async def principal():
-    # executa todos os cenarios de teste um depois do outro
+async def principal(concorrencia=CONCORRENCIA_PADRAO, nome_perfil=PERFIL_PADRAO, preenchimento=None,
+                    todas_paginas=False):
+    # executa os cenarios em paralelo, no maximo `concorrencia` por vez
+    # preenchimento e todas_paginas sobrescrevem o que vem do perfil
+    perfil = dict(PERFIS[nome_perfil])
+    if preenchimento:
+        perfil["preenchimento"] = preenchimento
+    if todas_paginas:
+        perfil["todas_paginas"] = True
     logger.info("=" * 60)
     logger.info("RPA DemoQA - Início da Execução")
     logger.info(f"Timestamp: {datetime.now().isoformat()}")
+    logger.info(f"Perfil: {nome_perfil} (preenchimento: {perfil['preenchimento']})")
     logger.info("=" * 60)
 
     # marca o horario de inicio pra calcular duracao depois
@@ -554,36 +746,32 @@ async def principal():
 
     # inicia o playwright e executa os testes
     async with async_playwright() as playwright:
-        # tenta iniciar o navegador em modo visual primeiro
+        # tenta iniciar o navegador em modo visual primeiro (perfil demo)
+        mostrar_interface = not perfil["headless"]
         try:
-            navegador, contexto, pagina = await configurar_navegador(playwright, mostrar_interface=True)
-            logger.info("Browser iniciado em modo HEADED (com interface)")
+            navegador = await iniciar_navegador(playwright, mostrar_interface=mostrar_interface)
+            logger.info(f"Browser iniciado em modo {'HEADED (com interface)' if mostrar_interface else 'HEADLESS'}")
         except Exception:
+            if not mostrar_interface:
+                raise
             # se falhar, usa modo headless (sem interface)
             logger.warning("Modo headed falhou, usando headless")
-            navegador, contexto, pagina = await configurar_navegador(playwright, mostrar_interface=False)
+            mostrar_interface = False
+            navegador = await iniciar_navegador(playwright, mostrar_interface=False)
             logger.info("Browser iniciado em modo HEADLESS")
 
         try:
-            # executa o cenario 1: text box
-            resultados["text_box"] = await cenario_caixa_texto(pagina)
-            await pagina.wait_for_timeout(5000)  # delay entre cenarios pra video
-
-            # executa o cenario 2: check box
-            resultados["check_box"] = await cenario_checkbox(pagina)
-            await pagina.wait_for_timeout(5000)  # delay entre cenarios pra video
-
-            # executa o cenario 3: web tables
-            resultados["web_tables"] = await cenario_tabelas_web(pagina)
-            await pagina.wait_for_timeout(5000)  # delay entre cenarios pra video
-
-            # executa o cenario 4: upload
-            resultados["upload"] = await cenario_upload(pagina)
-            await pagina.wait_for_timeout(3000)  # delay final
+            # um navegador so, um contexto por cenario, todos ao mesmo tempo
+            semaforo = asyncio.Semaphore(max(1, concorrencia))
+            logger.info(f"Executando {len(CENARIOS)} cenários (até {concorrencia} em paralelo)")
+            retornos = await asyncio.gather(*(
+                executar_cenario(navegador, nome, cenario, semaforo, mostrar_interface, perfil)
+                for nome, cenario in CENARIOS.items()
+            ))
+            resultados = dict(zip(CENARIOS, retornos))
 
         finally:
             # sempre fecha o navegador no final, mesmo se der erro
-            await contexto.close()
             await navegador.close()
 
     # calcula quanto tempo levou a execucao
@@ -595,10 +783,14 @@ async def principal():
             "timestamp_inicio": tempo_inicio.isoformat(),
             "timestamp_fim": datetime.now().isoformat(),
             "duracao_segundos": round(tempo_decorrido, 2),
+            "perfil": nome_perfil,
+            "preenchimento": perfil["preenchimento"],
+            "concorrencia": concorrencia,
             "cenarios_executados": len(resultados),
             "cenarios_com_sucesso": sum(1 for resultado in resultados.values() if resultado.get("status") == "sucesso"),
         },
         "resultados": {nome: resultado.get("status", "desconhecido") for nome, resultado in resultados.items()},
+        "erros": {nome: resultado["erro"] for nome, resultado in resultados.items() if "erro" in resultado},
     }
 
     # salva relatorio num arquivo json
@@ -620,4 +812,25 @@ async def principal():
 
 if __name__ == "__main__":
     # executa a funcao principal quando o script eh rodado direto
-    asyncio.run(principal())
+    parser = argparse.ArgumentParser(description="RPA DemoQA - roda todos os cenários")
+    parser.add_argument(
+        "--concorrencia", type=int, default=CONCORRENCIA_PADRAO,
+        help="quantos cenários rodam ao mesmo tempo (1 = um depois do outro)",
+    )
+    parser.add_argument(
+        "--perfil", choices=sorted(PERFIS), default=PERFIL_PADRAO,
+        help="demo: pausas e video; rapido: headless, sem pausas, so waits de seletor/resultado",
+    )
+    parser.add_argument(
+        "--preenchimento", choices=ESTRATEGIAS_PREENCHIMENTO,
+        help="como preencher os campos (padrao: o do perfil; demo = humano, rapido = fill)",
+    )
+    parser.add_argument(
+        "--todas-paginas", action="store_true",
+        help="web tables: maximiza as linhas por página e percorre todas as páginas (grava o csv em streaming)",
+    )
+    args = parser.parse_args()
+    asyncio.run(principal(
+        concorrencia=args.concorrencia, nome_perfil=args.perfil, preenchimento=args.preenchimento,
+        todas_paginas=args.todas_paginas,
+    ))